@@ -1,51 +1,144 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+import time
+BOOT_STARTED = time.perf_counter()
+
+from flask import Flask, current_app, render_template, request, jsonify, redirect, url_for, flash
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from models.database import mysql, init_db
-from models.user import User
+from models.database import mysql
+from models.instrumentation import sql_instrumentation
+from models.metrics import metrics
+from models.migrations import check_schema
+from models.health import db_health
+from models.user import User, user_cache
+from models.reference import references
+from models.movement import StockMovement
+from models.snapshot import StockSnapshot
+from models.archive import Archive
+from models.operations import Operations
+from models.operation_queue import OperationQueue
+from models.reservation import StockReservation
+from models.document_state import DocumentStates
+from models.cycle_count import CycleCount, CONFLICT_POLICIES
+from models.replenishment import replenishment
+from models.consumption import ConsumptionStats
+from models.kpi import KPI
+from models.alert import LowStockAlert
+from models.product_import import ProductImport
+from models.product_search import ProductSearch
+from models.warehouse import Warehouse
+from models.product import Product
+from models.stock_summary import StockSummary
+from models.category import Category
+from models.http_cache import collection_cache, compression
 from config import Config
 import MySQLdb.cursors
 import sys
-
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Initialize MySQL
-mysql.init_app(app)
+import threading
+from datetime import datetime, time as day_time
 
 # Login manager
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message_category = 'info'
 
+# Routes are collected here and registered on each app built by create_app()
+_routes = []
+
+def route(rule, **options):
+    def decorator(view):
+        _routes.append((rule, view, options))
+        return view
+    return decorator
+
+# Scrape-time gauges for the connection pool, caches and database health
+POOL_STATES = ('size', 'in_use', 'idle', 'waiting')
+POOL_TOTALS = ('created', 'closed', 'checkouts', 'timeouts', 'wait_seconds')
+metrics.gauge('stockmaster_db_pool_connections', 'Pooled connections by state', ('state',),
+              lambda: {(state,): value for state, value in mysql.pool.stats().items() if state in POOL_STATES})
+metrics.gauge('stockmaster_db_pool_events_total', 'Pool events since the worker started', ('event',),
+              lambda: {(event,): value for event, value in mysql.pool.stats().items() if event in POOL_TOTALS},
+              kind='counter')
+metrics.gauge('stockmaster_user_cache_lookups_total', 'User cache lookups by result', ('result',),
+              lambda: {('hit',): user_cache.hits, ('miss',): user_cache.misses}, kind='counter')
+metrics.gauge('stockmaster_user_cache_hit_ratio', 'User cache hit ratio', (),
+              lambda: {(): user_cache.stats()['hit_rate']})
+metrics.gauge('stockmaster_reference_block_allocations_total', 'Document number blocks reserved', (),
+              lambda: {(): references.stats()['allocations']}, kind='counter')
+metrics.gauge('stockmaster_db_up', 'Whether the database is reachable (last health probe)', (),
+              lambda: {(): 1 if db_health.status()['database'] == 'connected' else 0})
+
+def create_app(config=Config):
+    """Build the application without touching the database.
+
+    Extensions only read configuration here and the connection pool opens on
+    first use, so a preloading server can build the app once in its master
+    process and every worker still gets its own connections after fork.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    # Initialize MySQL
+    mysql.init_app(app)
+    sql_instrumentation.init_app(app)
+    metrics.init_app(app)
+    compression.init_app(app)
+    db_health.init_app(app)
+    user_cache.init_app(app)
+    KPI.init_app(app)
+    references.init_app(app)
+    replenishment.init_app(app)
+    ConsumptionStats.init_app(app)
+    StockSnapshot.init_app(app)
+    Archive.init_app(app)
+    OperationQueue.init_app(app)
+    login_manager.init_app(app)
+
+    for rule, view, options in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+
+    @app.before_request
+    def check_startup():
+        startup_check(app)
+
+    app.extensions['startup'] = {
+        'boot_ms': round((time.perf_counter() - BOOT_STARTED) * 1000, 1),
+        'schema_version': None,
+        'checked': False,
+        'lock': threading.Lock(),
+    }
+    return app
+
+def startup_check(app):
+    """Check the schema version once per process, on the first request.
+
+    One indexed read that doubles as the first health probe. DDL never runs
+    here; apply migrations with `python -m models.migrations` or set
+    AUTO_MIGRATE=true.
+    """
+    startup = app.extensions['startup']
+    if startup['checked']:
+        return
+    with startup['lock']:
+        if startup['checked']:
+            return
+        try:
+            startup['schema_version'] = check_schema(app)
+            db_health.record(True)
+        except Exception as e:
+            db_health.last_error = str(e)
+            db_health.record(False)
+            print(f"⚠️  Database setup warning: {str(e)}")
+        startup['checked'] = True
+
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        return User.get_by_id(int(user_id))
+        return User.get_cached(int(user_id))
     except:
         return None
 
-# Test database connection at startup
+# Cached database health state (probed at most once per DB_HEALTH_TTL)
 def check_database():
-    try:
-        cursor = mysql.connection.cursor()
-        cursor.execute('SELECT 1')
-        cursor.close()
-        print("✅ Database connection: SUCCESS")
-        return True
-    except Exception as e:
-        print(f"❌ Database connection: FAILED - {str(e)}")
-        return False
-
-# Initialize database (with error handling)
-db_initialized = False
-try:
-    if check_database():
-        db_initialized = init_db(app)
-    else:
-        print("⚠️  Skipping database initialization")
-except Exception as e:
-    print(f"⚠️  Database setup warning: {str(e)}")
+    return db_health.is_up()
 
 # Simple fallback user for testing
 class FallbackUser:
@@ -61,7 +154,7 @@ class FallbackUser:
         return str(self.id)
 
 # Routes with database error handling
-@app.route('/')
+@route('/')
 def index():
     if not check_database():
         flash('Database connection failed. Using demo mode.', 'warning')
@@ -74,7 +167,7 @@ def index():
         return redirect(url_for('dashboard'))
     return redirect(url_for('login'))
 
-@app.route('/dashboard')
+@route('/dashboard')
 @login_required
 def dashboard():
     try:
@@ -88,22 +181,14 @@ def dashboard():
                                 pending_transfers=0,
                                 recent_activities=[])
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Your existing dashboard queries...
-        cursor.execute('SELECT COUNT(*) as total FROM products')
-        total_products = cursor.fetchone()['total']
-        
-        # ... [rest of your dashboard queries] ...
-        
-        cursor.close()
+        kpis = KPI.summary()
         
         return render_template('dashboard.html',
-                            total_products=total_products,
-                            low_stock=0,
-                            pending_receipts=0,
-                            pending_deliveries=0,
-                            pending_transfers=0,
+                            total_products=kpis['total_products'],
+                            low_stock=kpis['low_stock'],
+                            pending_receipts=kpis['pending_receipts'],
+                            pending_deliveries=kpis['pending_deliveries'],
+                            pending_transfers=kpis['pending_transfers'],
                             recent_activities=[])
     
     except Exception as e:
@@ -117,7 +202,102 @@ def dashboard():
                             pending_transfers=0,
                             recent_activities=[])
 
-@app.route('/login', methods=['GET', 'POST'])
+@route('/api/kpis')
+@login_required
+def api_kpis():
+    if not check_database():
+        return jsonify({'error': 'Database offline'}), 503
+    return jsonify(KPI.summary())
+
+@route('/api/low-stock-alerts')
+@login_required
+def api_low_stock_alerts():
+    if not check_database():
+        return jsonify([])
+    alerts = LowStockAlert.get_all(limit=request.args.get('limit', 50, type=int))
+    for alert in alerts:
+        alert['flagged_at'] = alert['flagged_at'].isoformat()
+    return jsonify(alerts)
+
+@route('/api/products')
+@login_required
+def api_products():
+    return collection_cache.response('products', Product.get_all)
+
+@route('/api/categories')
+@login_required
+def api_categories():
+    return collection_cache.response('categories', Category.get_all)
+
+@route('/api/warehouses')
+@login_required
+def api_warehouses():
+    return collection_cache.response('warehouses', Warehouse.get_all)
+
+def product_filters(args):
+    """Parse the products page filters from a query string."""
+    return {
+        'category_id': args.get('category', type=int),
+        'warehouse_id': args.get('warehouse', type=int),
+        'stock_status': args.get('stock_status') or None,
+    }
+
+@route('/products')
+@login_required
+def products():
+    if not check_database():
+        return render_template('products/products.html', products=[], categories=[], warehouses=[],
+                               filters=request.args, next_cursor=None)
+    try:
+        products, next_cursor = StockSummary.search(**product_filters(request.args))
+    except ValueError as e:
+        flash(f'Invalid filter: {str(e)}', 'error')
+        products, next_cursor = [], None
+    return render_template('products/products.html',
+                           products=products,
+                           categories=Category.get_all(),
+                           warehouses=Warehouse.get_all(),
+                           filters=request.args,
+                           next_cursor=next_cursor)
+
+@route('/api/products/stock')
+@login_required
+def api_product_stock():
+    try:
+        products, next_cursor = StockSummary.search(
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', StockSummary.PAGE_SIZE, type=int),
+            **product_filters(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'products': products, 'next_cursor': next_cursor})
+
+@route('/api/products/autocomplete')
+@login_required
+def api_product_autocomplete():
+    if not check_database():
+        return jsonify([])
+    return jsonify(ProductSearch.autocomplete(request.args.get('q', ''),
+                                              limit=request.args.get('limit', ProductSearch.DEFAULT_LIMIT, type=int)))
+
+@route('/api/products/import', methods=['POST'])
+@login_required
+def api_import_products():
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'No file uploaded'}), 400
+    fmt = request.form.get('format') or ProductImport.detect_format(upload.filename)
+    if fmt not in ProductImport.FORMATS:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+
+    importer = ProductImport(chunk_size=current_app.config.get('PRODUCT_IMPORT_CHUNK_SIZE', ProductImport.CHUNK_SIZE))
+    try:
+        report = importer.run(upload.stream, fmt)
+    except UnicodeDecodeError as e:
+        return jsonify({'error': f'File is not valid UTF-8: {str(e)}', **importer.report}), 400
+    return jsonify(report), 200 if not report['failed'] else 207
+
+@route('/login', methods=['GET', 'POST'])
 def login():
     # If database is down, use fallback login
     if not check_database():
@@ -155,7 +335,7 @@ def login():
     
     return render_template('auth/login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@route('/register', methods=['GET', 'POST'])
 def register():
     if not check_database():
         flash('Registration disabled - Database offline', 'error')
@@ -185,39 +365,293 @@ def register():
     
     return render_template('auth/register.html')
 
-@app.route('/logout')
+@route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('You have been logged out.', 'info')
     return redirect(url_for('login'))
 
-@app.route('/test-db')
+@route('/test-db')
 def test_db():
     if check_database():
-        return jsonify({'status': 'success', 'message': 'Database connected!'})
+        return jsonify({'status': 'success', 'message': 'Database connected!', 'health': db_health.status()})
     else:
-        return jsonify({'status': 'error', 'message': 'Database connection failed!'})
+        return jsonify({'status': 'error', 'message': 'Database connection failed!', 'health': db_health.status()})
+
+def movement_filters(args):
+    """Parse the move history filters from a query string."""
+    filters = {
+        'movement_type': args.get('movement_type') or None,
+        'warehouse_id': args.get('warehouse', type=int),
+        'start_date': None,
+        'end_date': None,
+    }
+    for key in ('start_date', 'end_date'):
+        if args.get(key):
+            filters[key] = datetime.strptime(args[key], '%Y-%m-%d').date()
+    return filters
+
+@route('/move-history')
+@login_required
+def move_history():
+    if not check_database():
+        return render_template('move_history.html', movements=[], warehouses=[], filters=request.args, next_cursor=None)
+    try:
+        filters = movement_filters(request.args)
+        movements, next_cursor = StockMovement.search(**filters)
+    except ValueError as e:
+        flash(f'Invalid filter: {str(e)}', 'error')
+        movements, next_cursor = [], None
+    return render_template('move_history.html',
+                           movements=movements,
+                           warehouses=Warehouse.get_all(),
+                           filters=request.args,
+                           next_cursor=next_cursor)
+
+@route('/api/movements')
+@login_required
+def api_movements():
+    try:
+        movements, next_cursor = StockMovement.search(
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', StockMovement.PAGE_SIZE, type=int),
+            **movement_filters(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    for movement in movements:
+        movement['created_at'] = movement['created_at'].strftime('%Y-%m-%d %H:%M')
+    return jsonify({'movements': movements, 'next_cursor': next_cursor})
+
+@route('/api/movements/daily')
+@login_required
+def api_movements_daily():
+    try:
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return jsonify({'error': 'start_date and end_date (YYYY-MM-DD) are required'}), 400
+    totals = StockMovement.daily_totals(start_date, end_date,
+                                        warehouse_id=request.args.get('warehouse', type=int),
+                                        product_id=request.args.get('product', type=int))
+    for total in totals:
+        total['day'] = total['day'].isoformat()
+    return jsonify(totals)
+
+@route('/api/operations', methods=['POST'])
+@login_required
+def api_create_operation():
+    data = request.get_json(silent=True) or {}
+    kind = data.pop('kind', None)
+    fields = {**data, 'created_by': current_user.id}
+    try:
+        OperationQueue.validate(kind, fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if current_app.config.get('ASYNC_OPERATIONS'):
+        queue_id = OperationQueue.enqueue(kind, fields)
+        return jsonify({'queue_id': queue_id, 'status': 'queued',
+                        'status_url': url_for('api_operation_status', queue_id=queue_id)}), 202
+    document_id, reference = Operations.create(kind, **fields)
+    return jsonify({'document_id': document_id, 'reference': reference, 'status': 'done'}), 201
+
+@route('/api/operations/<int:queue_id>')
+@login_required
+def api_operation_status(queue_id):
+    entry = OperationQueue.get(queue_id)
+    if entry is None:
+        return jsonify({'error': 'Not found'}), 404
+    for key in ('created_at', 'processed_at'):
+        if entry[key]:
+            entry[key] = entry[key].isoformat()
+    return jsonify(entry)
+
+@route('/api/stock/<int:product_id>/<int:warehouse_id>')
+@login_required
+def api_stock_line(product_id, warehouse_id):
+    return jsonify({'product_id': product_id, 'warehouse_id': warehouse_id,
+                    **StockReservation.get_line(product_id, warehouse_id)})
+
+@route('/api/stock/availability', methods=['POST'])
+@login_required
+def api_stock_availability():
+    data = request.get_json(silent=True) or {}
+    try:
+        lines, shortages = StockReservation.check(data.get('items') or [])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'items must be a list of {product_id, warehouse_id, quantity}'}), 400
+    return jsonify({
+        'available': not shortages,
+        'lines': [{'product_id': product_id, 'warehouse_id': warehouse_id, **line}
+                  for (product_id, warehouse_id), line in sorted(lines.items())],
+        'shortages': shortages,
+    })
+
+@route('/api/documents/<kind>/<action>', methods=['POST'])
+@login_required
+def api_document_transition(kind, action):
+    data = request.get_json(silent=True) or {}
+    try:
+        results = DocumentStates.transition(kind, action, data.get('ids') or [])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    succeeded = sum(1 for result in results if result['ok'])
+    return jsonify({'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded})
+
+@route('/api/documents/<kind>/<int:document_id>/<action>', methods=['POST'])
+@login_required
+def api_document_transition_one(kind, document_id, action):
+    try:
+        result, = DocumentStates.transition(kind, action, [document_id])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if result['ok']:
+        return jsonify(result)
+    return jsonify(result), 404 if result['status'] is None else 409
+
+@route('/api/cycle-counts', methods=['POST'])
+@login_required
+def api_start_cycle_count():
+    data = request.get_json(silent=True) or {}
+    count_id = CycleCount.start(current_user.id, warehouse_id=data.get('warehouse_id'), reason=data.get('reason'))
+    return jsonify({'id': count_id, 'status': 'open',
+                    'lines_url': url_for('api_cycle_count_lines', count_id=count_id)}), 201
+
+@route('/api/cycle-counts/<int:count_id>')
+@login_required
+def api_cycle_count(count_id):
+    session = CycleCount.get(count_id)
+    if session is None:
+        return jsonify({'error': 'Not found'}), 404
+    for key in ('created_at', 'applied_at'):
+        if session[key]:
+            session[key] = session[key].isoformat()
+    return jsonify(session)
+
+@route('/api/cycle-counts/<int:count_id>/lines', methods=['POST'])
+@login_required
+def api_cycle_count_lines(count_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        received = CycleCount.add_lines(count_id, data.get('lines') or [])
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'id': count_id, 'received': received})
+
+@route('/api/cycle-counts/<int:count_id>/apply', methods=['POST'])
+@login_required
+def api_apply_cycle_count(count_id):
+    on_conflict = (request.get_json(silent=True) or {}).get('on_conflict', 'skip')
+    if on_conflict not in CONFLICT_POLICIES:
+        return jsonify({'error': f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}"}), 400
+    try:
+        report = CycleCount.apply(count_id, current_user.id, on_conflict=on_conflict)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(report)
+
+@route('/api/cycle-counts/<int:count_id>/cancel', methods=['POST'])
+@login_required
+def api_cancel_cycle_count(count_id):
+    if not CycleCount.cancel(count_id):
+        return jsonify({'error': f'Cycle count {count_id} is not open'}), 409
+    return jsonify({'id': count_id, 'status': 'canceled'})
+
+@route('/api/stock/consumption')
+@login_required
+def api_stock_consumption():
+    try:
+        lines = ConsumptionStats.get(product_id=request.args.get('product', type=int),
+                                     warehouse_id=request.args.get('warehouse', type=int),
+                                     limit=request.args.get('limit', 100, type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    for line in lines:
+        if line['last_movement_at']:
+            line['last_movement_at'] = line['last_movement_at'].isoformat()
+    return jsonify(lines)
+
+@route('/api/reports/replenishment')
+@login_required
+def api_replenishment():
+    return jsonify(replenishment.report(warehouse_id=request.args.get('warehouse', type=int),
+                                        limit=request.args.get('limit', 100, type=int)))
+
+def as_of_param(value):
+    """Parse `at` as a date (meaning the end of that day) or an ISO datetime."""
+    if not value:
+        return datetime.now()
+    if len(value) == 10:
+        return datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), day_time.max)
+    return datetime.fromisoformat(value)
+
+@route('/reports/stock-as-of')
+@login_required
+def stock_as_of():
+    lines, source = [], None
+    if not check_database():
+        return render_template('reports/stock_as_of.html', lines=lines, source=source, warehouses=[], filters=request.args)
+    try:
+        lines, source = StockSnapshot.as_of(as_of_param(request.args.get('at')),
+                                            warehouse_id=request.args.get('warehouse', type=int))
+    except ValueError as e:
+        flash(f'Invalid date: {str(e)}', 'error')
+    return render_template('reports/stock_as_of.html',
+                           lines=lines,
+                           source=source,
+                           warehouses=Warehouse.get_all(),
+                           filters=request.args)
+
+@route('/api/stock/as-of')
+@login_required
+def api_stock_as_of():
+    try:
+        lines, source = StockSnapshot.as_of(as_of_param(request.args.get('at')),
+                                            warehouse_id=request.args.get('warehouse', type=int),
+                                            product_id=request.args.get('product', type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    source['as_of'] = source['as_of'].isoformat()
+    if source['snapshot_taken_at']:
+        source['snapshot_taken_at'] = source['snapshot_taken_at'].isoformat()
+    return jsonify({**source, 'lines': lines})
 
-@app.route('/settings/profile')
+@route('/settings/profile')
 @login_required
 def profile():
     print("👤 Profile route accessed for user:", current_user.name)  # Debug line
     return render_template('settings/profile.html', user=current_user)
 
-@app.route('/status')
+@route('/status')
 def status():
+    check_database()
     return jsonify({
-        'database': 'connected' if check_database() else 'disconnected',
+        **db_health.status(),
+        'schema_version': current_app.extensions['startup']['schema_version'],
+        'boot_ms': current_app.extensions['startup']['boot_ms'],
+        'pool': mysql.pool.stats(),
+        'user_cache': user_cache.stats(),
+        'references': references.stats(),
+        'replenishment': replenishment.stats(),
         'authenticated': current_user.is_authenticated,
         'user': current_user.name if current_user.is_authenticated else 'None'
     })
 
 if __name__ == '__main__':
+    # Development server; production runs wsgi:app under gunicorn (see gunicorn.conf.py)
+    app = create_app()
     print("🚀 Starting StockMaster Inventory Management System...")
     print("🔧 Debug mode: ON")
-    print("📊 Database status:", "✅ Connected" if check_database() else "❌ Disconnected")
+    with app.app_context():
+        startup_check(app)
+        print("📊 Database status:", "✅ Connected" if check_database() else "❌ Disconnected")
+    print(f"⏱️  Application built in {app.extensions['startup']['boot_ms']:.0f}ms")
     print("🌐 Application URL: http://localhost:5000")
     print("💡 Tip: If database fails, system will use demo mode")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
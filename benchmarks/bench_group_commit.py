@@ -0,0 +1,53 @@
+"""Throughput of queued documents created one per transaction vs group-committed.
+
+Every document is a stock adjustment (the document kind that moves stock when
+it is created) of --lines lines drawn from --hot-skus products, so documents
+in a group keep hitting the same stock rows. The database is
+simulated as in bench_stock_batch.py (each statement is one round trip of
+--rtt-ms); a group also pays for claiming and marking its queue rows.
+
+    python benchmarks/bench_group_commit.py --documents 2000 --groups 1 10 50 100
+"""
+import argparse
+import random
+import time
+
+from bench_stock_batch import SimulatedDatabase, operations, reference
+from models.operations import Operations
+
+
+def run(db, documents, group_size):
+    db.round_trips = 0
+    start = time.perf_counter()
+    for first in range(0, len(documents), group_size):
+        group = documents[first:first + group_size]
+        cursor = db.cursor()
+        cursor.execute('SELECT id, kind, payload FROM operation_queue FOR UPDATE SKIP LOCKED')
+        Operations.create_documents([('adjustment', fields) for fields in group])
+        cursor.execute('UPDATE operation_queue SET status = %s', ('done',))
+        db.commit()
+    return time.perf_counter() - start, db.round_trips
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=2000)
+    parser.add_argument('--lines', type=int, default=5)
+    parser.add_argument('--hot-skus', type=int, default=20)
+    parser.add_argument('--groups', type=int, nargs='+', default=[1, 10, 50, 100])
+    parser.add_argument('--rtt-ms', type=float, default=0.5)
+    args = parser.parse_args()
+
+    random.seed(1)
+    documents = [{'reason': 'bench', 'created_by': None,
+                  'items': [{'product_id': random.randint(1, args.hot_skus), 'warehouse_id': 1,
+                             'current_quantity': 0, 'new_quantity': 1} for _ in range(args.lines)]}
+                 for _ in range(args.documents)]
+
+    db = SimulatedDatabase(args.rtt_ms / 1000.0)
+    operations.mysql = reference.mysql = db
+    print(f"Simulated MySQL, {args.rtt_ms} ms per round trip, {args.documents} documents on {args.hot_skus} hot SKUs")
+    print(f"{'group':>6} | {'trips/doc':>9} | {'docs/s':>8}")
+    for group_size in args.groups:
+        elapsed, trips = run(db, documents, group_size)
+        print(f"{group_size:>6} | {trips / args.documents:>9.2f} | {args.documents / elapsed:>8.0f}")
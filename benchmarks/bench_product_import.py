@@ -0,0 +1,149 @@
+"""Throughput (rows/s) and peak memory of the streaming product import.
+
+Generates a CSV (or JSON lines) catalog of --rows products on disk, then
+streams it through models.product_import.ProductImport.
+
+By default the database is simulated so the parse/validate/batch pipeline is
+measured on its own; each statement sleeps for --rtt-ms. Pass --live to
+import into the MySQL database configured in config.py (the generated SKUs
+are deleted afterwards unless --keep is given).
+
+    python benchmarks/bench_product_import.py --rows 1000000
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models.product_import as product_import
+import models.kpi as kpi
+import models.alert as alert
+from models.product_import import ProductImport
+
+
+def generate(path, rows, fmt, prefix):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['sku', 'name', 'category', 'unit_of_measure', 'description', 'min_stock_level'])
+            for i in range(rows):
+                writer.writerow([f'{prefix}-{i:07d}', f'Bench product {i}', '', 'pcs', f'Generated row {i}', i % 50])
+        else:
+            for i in range(rows):
+                f.write(json.dumps({'sku': f'{prefix}-{i:07d}', 'name': f'Bench product {i}', 'unit_of_measure': 'pcs',
+                                    'description': f'Generated row {i}', 'min_stock_level': i % 50}) + '\n')
+
+
+class SimulatedCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        self.db.round_trip()
+        self._rows = []
+
+    def executemany(self, query, seq):
+        self.db.round_trip()
+        self.db.rows_written += len(seq)
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class SimulatedDatabase:
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.round_trips = 0
+        self.rows_written = 0
+
+    def round_trip(self):
+        self.round_trips += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    @property
+    def connection(self):
+        return self
+
+    def cursor(self, *args):
+        return SimulatedCursor(self)
+
+    def commit(self):
+        self.round_trip()
+
+    def rollback(self):
+        self.round_trip()
+
+
+def run(path, fmt, chunk_size):
+    importer = ProductImport(chunk_size=chunk_size)
+    start = time.perf_counter()
+    with open(path, 'rb') as stream:
+        report = importer.run(stream, fmt)
+    return report, time.perf_counter() - start
+
+
+def cleanup(prefix):
+    from models.database import mysql
+    cursor = mysql.connection.cursor()
+    while True:
+        cursor.execute('DELETE FROM products WHERE sku LIKE %s LIMIT 10000', (prefix + '-%',))
+        mysql.connection.commit()
+        if cursor.rowcount < 10000:
+            break
+    cursor.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--format', choices=ProductImport.FORMATS, default='csv')
+    parser.add_argument('--chunk-size', type=int, default=ProductImport.CHUNK_SIZE)
+    parser.add_argument('--rtt-ms', type=float, default=0.5)
+    parser.add_argument('--live', action='store_true')
+    parser.add_argument('--keep', action='store_true', help='keep imported rows in live mode')
+    args = parser.parse_args()
+
+    prefix = f'BENCH-{uuid.uuid4().hex[:6]}'
+    fd, path = tempfile.mkstemp(suffix='.' + args.format)
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        generate(path, args.rows, args.format, prefix)
+        print(f"📄 Generated {args.rows:,} rows ({os.path.getsize(path) / 1e6:.0f} MB) in {time.perf_counter() - start:.1f}s")
+
+        if args.live:
+            from flask import Flask
+            from config import Config
+            from models.database import mysql
+
+            app = Flask(__name__)
+            app.config.from_object(Config)
+            mysql.init_app(app)
+            with app.app_context():
+                report, elapsed = run(path, args.format, args.chunk_size)
+                if not args.keep:
+                    cleanup(prefix)
+        else:
+            db = SimulatedDatabase(args.rtt_ms / 1000.0)
+            product_import.mysql = kpi.mysql = alert.mysql = db
+            report, elapsed = run(path, args.format, args.chunk_size)
+            print(f"🔁 {db.round_trips:,} simulated round trips at {args.rtt_ms} ms")
+
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"📊 {report['rows']:,} rows in {elapsed:.1f}s = {report['rows'] / elapsed:,.0f} rows/s "
+              f"(inserted {report['inserted']:,}, updated {report['updated']:,}, failed {report['failed']:,}), "
+              f"peak RSS {peak_mb:.0f} MB")
+    finally:
+        os.remove(path)
@@ -0,0 +1,98 @@
+"""Time to compute replenishment figures for a whole catalog.
+
+Builds --products x --warehouses stock lines with random on-hand quantities,
+delivery history and minimum levels, then times Replenishment.align and
+Replenishment.calculate (the NumPy pass) against the same formulas evaluated
+line by line in Python. Pass --live to time Replenishment.result() against
+the MySQL database configured in config.py, loading included.
+
+    python benchmarks/bench_replenishment.py --products 100000 --warehouses 20
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.replenishment import Replenishment, KEY_FACTOR
+
+
+def generate(products, warehouses, seed):
+    rng = np.random.default_rng(seed)
+    product_ids = np.repeat(np.arange(1, products + 1, dtype=np.int64), warehouses)
+    warehouse_ids = np.tile(np.arange(1, warehouses + 1, dtype=np.int64), products)
+    stock_keys = product_ids * KEY_FACTOR + warehouse_ids
+    quantities = rng.integers(0, 500, len(stock_keys))
+    # About a third of the lines had deliveries in the window
+    sold = rng.random(len(stock_keys)) < 0.35
+    demand_keys = stock_keys[sold]
+    demand = rng.integers(1, 300, len(demand_keys))
+    min_levels = rng.integers(0, 50, products + 1)
+    return stock_keys, quantities, demand_keys, demand, min_levels
+
+
+def python_loop(stock_keys, quantities, demand_keys, demand, min_levels, settings):
+    window, lead, safety_days, review = settings
+    outflow = dict(zip(demand_keys.tolist(), demand.tolist()))
+    suggestions = 0
+    for key, on_hand in zip(stock_keys.tolist(), quantities.tolist()):
+        velocity = outflow.get(key, 0) / window
+        safety = max(min_levels[key // KEY_FACTOR], velocity * safety_days)
+        reorder_point = velocity * lead + safety
+        if on_hand <= reorder_point and math.ceil(reorder_point + velocity * review - on_hand) > 0:
+            suggestions += 1
+    return suggestions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--warehouses', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--live', action='store_true')
+    args = parser.parse_args()
+    settings = (Replenishment.WINDOW_DAYS, Replenishment.LEAD_TIME_DAYS,
+                Replenishment.SAFETY_DAYS, Replenishment.REVIEW_DAYS)
+
+    if args.live:
+        from flask import Flask
+        from config import Config
+        from models.database import mysql
+        from models.replenishment import replenishment
+
+        app = Flask(__name__)
+        app.config.from_object(Config)
+        mysql.init_app(app)
+        replenishment.init_app(app)
+        with app.app_context():
+            start = time.perf_counter()
+            report = replenishment.report(limit=10)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            replenishment.report(limit=10)
+            warm = time.perf_counter() - start
+        print(f"📊 {report['stock_lines']:,} lines, {report['total']:,} to reorder: "
+              f"{cold:.2f}s cold (load + compute), {warm * 1000:.1f} ms cached")
+        sys.exit()
+
+    stock_keys, quantities, demand_keys, demand, min_levels = generate(args.products, args.warehouses, args.seed)
+    print(f"🧮 {len(stock_keys):,} stock lines, {len(demand_keys):,} with deliveries")
+
+    start = time.perf_counter()
+    result = Replenishment.calculate(*Replenishment.align(stock_keys, quantities, demand_keys, demand, min_levels),
+                                     *settings)
+    vectorized = time.perf_counter() - start
+    vectorized_count = int((result['suggested'] > 0).sum())
+
+    start = time.perf_counter()
+    loop_count = python_loop(stock_keys, quantities, demand_keys, demand, min_levels, settings)
+    loop = time.perf_counter() - start
+
+    print(f"📊 NumPy: {vectorized:.2f}s, Python loop: {loop:.2f}s ({loop / vectorized:.0f}x); "
+          f"{vectorized_count:,} lines to reorder")
+    if vectorized_count != loop_count:
+        sys.exit(f"❌ Results differ: {vectorized_count} vs {loop_count}")
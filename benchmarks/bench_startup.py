@@ -0,0 +1,62 @@
+"""Startup cost of the application: import, create_app(), first request, steady state.
+
+Every repetition runs in a fresh interpreter so module imports are cold.
+Without --live the database is unreachable on purpose (MYSQL_HOST points at
+a closed port), which measures the application's own startup work and the
+demo-mode request path; with --live the configured MySQL server is used and
+the first request includes the schema check and opening the pool.
+
+    python benchmarks/bench_startup.py --runs 10 --requests 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app()
+created = time.perf_counter()
+client = app.test_client()
+client.get(sys.argv[1])
+first = time.perf_counter()
+for _ in range(int(sys.argv[2])):
+    client.get(sys.argv[1])
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first - created) * 1000,
+    'steady_request_ms': (done - first) * 1000 / max(1, int(sys.argv[2])),
+}))
+'''
+
+
+def run_once(path, requests, live):
+    env = dict(os.environ)
+    if not live:
+        env.update({'MYSQL_HOST': '127.0.0.1', 'MYSQL_PORT': '1'})
+    output = subprocess.run([sys.executable, '-c', CHILD, path, str(requests)], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=200, help='steady-state requests per run')
+    parser.add_argument('--path', default='/test-db')
+    parser.add_argument('--live', action='store_true')
+    args = parser.parse_args()
+
+    results = [run_once(args.path, args.requests, args.live) for _ in range(args.runs)]
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'steady_request_ms'):
+        values = [result[key] for result in results]
+        print(f"📊 {key:<18} median {statistics.median(values):8.2f}  min {min(values):8.2f}  max {max(values):8.2f}")
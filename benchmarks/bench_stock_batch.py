@@ -0,0 +1,213 @@
+"""Round trips and latency of receiving a receipt by line count.
+
+Compares the batched stock path (the receipt insert plus the single
+apply_stock_deltas call its validation makes) against the former per-line
+loop (SELECT, then UPDATE or INSERT, then a movement INSERT for every line).
+
+By default the database is simulated: every execute/executemany counts as
+one round trip and sleeps for --rtt-ms. Pass --live to run against the
+MySQL database configured in config.py; the receipts are rolled back.
+
+    python benchmarks/bench_stock_batch.py --lines 1 10 100 500 --rtt-ms 0.5
+"""
+import argparse
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models.operations as operations
+import models.reference as reference
+from models.operations import Operations, StockDelta
+
+
+class SimulatedCursor:
+    def __init__(self, db):
+        self.db = db
+        self.lastrowid = None
+        self._rows = []
+
+    def _round_trip(self):
+        self.db.round_trips += 1
+        if self.db.rtt:
+            time.sleep(self.db.rtt)
+
+    def execute(self, query, params=()):
+        self._round_trip()
+        sql = ' '.join(query.split()).upper()
+        if sql.startswith('SELECT QUANTITY FROM STOCK'):
+            key = tuple(params)
+            self._rows = [(self.db.stock[key],)] if key in self.db.stock else []
+        elif sql.startswith('SELECT S.PRODUCT_ID, S.WAREHOUSE_ID, S.QUANTITY, P.MIN_STOCK_LEVEL'):
+            keys = list(zip(params[0::2], params[1::2]))
+            self._rows = [(p, w, self.db.stock[(p, w)], 0) for p, w in keys if (p, w) in self.db.stock]
+        elif sql.startswith('INSERT INTO DOCUMENT_SEQUENCES'):
+            name, size, _ = params
+            self.db.sequences[name] = self.db.sequences.get(name, 0) + size
+            self.db.last_insert_id = self.db.sequences[name]
+        elif sql.startswith('SELECT LAST_INSERT_ID()'):
+            self._rows = [(self.db.last_insert_id,)]
+        elif sql.startswith('UPDATE STOCK'):
+            quantity, product_id, warehouse_id = params
+            self.db.stock[(product_id, warehouse_id)] = quantity
+        elif sql.startswith('INSERT INTO STOCK '):
+            product_id, warehouse_id, quantity = params
+            self.db.stock[(product_id, warehouse_id)] = quantity
+        else:
+            self.db.next_id += 1
+            self.lastrowid = self.db.next_id
+
+    def executemany(self, query, seq):
+        self._round_trip()
+        if query.split()[2] == 'stock':
+            for product_id, warehouse_id, change in seq:
+                key = (product_id, warehouse_id)
+                self.db.stock[key] = self.db.stock.get(key, 0) + change
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class SimulatedDatabase:
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.round_trips = 0
+        self.next_id = 0
+        self.stock = {}
+        self.sequences = {}
+        self.last_insert_id = 0
+        self.pool = SimulatedPool(self)
+
+    # Mimics the MySQL extension object
+    @property
+    def connection(self):
+        return self
+
+    def cursor(self, *args):
+        return SimulatedCursor(self)
+
+    def commit(self):
+        self.round_trips += 1
+
+    def rollback(self):
+        self.round_trips += 1
+
+
+class SimulatedPool:
+    # Reference blocks are allocated on a pooled connection of their own
+    def __init__(self, db):
+        self.db = db
+
+    @contextmanager
+    def connection(self):
+        yield self.db
+
+
+def legacy_receipt(db, warehouse_id, items):
+    """The pre-batch create_receipt: one item INSERT and update_stock per line."""
+    cursor = db.cursor()
+    cursor.execute('INSERT INTO receipts (reference, supplier, created_by) VALUES (%s, %s, %s)',
+                   (Operations.generate_reference('REC'), 'bench', None))
+    receipt_id = cursor.lastrowid
+    for item in items:
+        cursor.execute('INSERT INTO receipt_items (receipt_id, product_id, quantity, warehouse_id) VALUES (%s, %s, %s, %s)',
+                       (receipt_id, item['product_id'], item['quantity'], warehouse_id))
+        key = (item['product_id'], warehouse_id)
+        cursor.execute('SELECT quantity FROM stock WHERE product_id = %s AND warehouse_id = %s', key)
+        current = cursor.fetchone()
+        if current:
+            cursor.execute('UPDATE stock SET quantity = %s WHERE product_id = %s AND warehouse_id = %s',
+                           (current[0] + item['quantity'],) + key)
+        else:
+            cursor.execute('INSERT INTO stock (product_id, warehouse_id, quantity) VALUES (%s, %s, %s)',
+                           key + (item['quantity'],))
+        cursor.execute('INSERT INTO stock_movements VALUES (%s)', (receipt_id,))
+    db.commit()
+
+
+def batch_receipt(db, warehouse_id, items):
+    """Insert a receipt and apply its stock in one transaction, as validation does."""
+    cursor = db.cursor()
+    receipt_id, _, _ = Operations.insert_receipt(cursor, 'bench', warehouse_id, items, None)
+    Operations.apply_stock_deltas([StockDelta(item['product_id'], warehouse_id, item['quantity'], 'receipt', receipt_id)
+                                   for item in items])
+    cursor.close()
+    db.commit()
+
+
+def measure(fn, db, repeat):
+    db.round_trips = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    return db.round_trips / repeat, elapsed * 1000
+
+
+def run_simulated(line_counts, rtt_ms, repeat):
+    db = SimulatedDatabase(rtt_ms / 1000.0)
+    operations.mysql = reference.mysql = db
+    print(f"Simulated MySQL, {rtt_ms} ms per round trip")
+    print(f"{'lines':>6} | {'legacy trips':>12} {'legacy ms':>10} | {'batch trips':>11} {'batch ms':>9} | {'speedup':>7}")
+    for lines in line_counts:
+        items = [{'product_id': i + 1, 'quantity': 5} for i in range(lines)]
+        legacy_trips, legacy_ms = measure(lambda: legacy_receipt(db, 1, items), db, repeat)
+        batch_trips, batch_ms = measure(lambda: batch_receipt(db, 1, items), db, repeat)
+        print(f"{lines:>6} | {legacy_trips:>12.0f} {legacy_ms:>10.2f} | {batch_trips:>11.0f} {batch_ms:>9.2f} | "
+              f"{legacy_ms / batch_ms if batch_ms else float('inf'):>6.1f}x")
+
+
+def run_live(line_counts, repeat):
+    from flask import Flask
+    from config import Config
+    from models.database import mysql
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    mysql.init_app(app)
+    with app.app_context():
+        cursor = mysql.connection.cursor()
+        cursor.execute('SELECT id FROM warehouses ORDER BY id LIMIT 1')
+        warehouse = cursor.fetchone()
+        cursor.execute('SELECT id FROM products ORDER BY id LIMIT %s', (max(line_counts),))
+        product_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        if not warehouse or len(product_ids) < max(line_counts):
+            sys.exit('Live mode needs one warehouse and at least %d products' % max(line_counts))
+
+        # Keep every receipt in an aborted transaction
+        commit = mysql.connection.commit
+        mysql.connection.commit = lambda: None
+        try:
+            print(f"{'lines':>6} | {'batch ms':>9}")
+            for lines in line_counts:
+                items = [{'product_id': pid, 'quantity': 5} for pid in product_ids[:lines]]
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    batch_receipt(mysql.connection, warehouse[0], items)
+                    mysql.connection.rollback()
+                print(f"{lines:>6} | {(time.perf_counter() - start) * 1000 / repeat:>9.2f}")
+        finally:
+            mysql.connection.commit = commit
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50, 100, 500, 1000])
+    parser.add_argument('--rtt-ms', type=float, default=0.5)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--live', action='store_true')
+    args = parser.parse_args()
+
+    if args.live:
+        run_live(args.lines, args.repeat)
+    else:
+        run_simulated(args.lines, args.rtt_ms, args.repeat)
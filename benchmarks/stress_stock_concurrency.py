@@ -0,0 +1,185 @@
+"""Concurrent stock mutation stress check against a live MySQL database.
+
+Runs receipts, delivery orders and internal transfers from many threads over a
+small set of hot products. Receipts are validated right away; delivery orders
+and transfers are confirmed (reserving the stock they take out) and validated
+when that stock could be reserved. Then verifies that:
+
+  * every stock row equals the sum of the deltas that were committed,
+  * no reservation is left behind, and
+  * for every (product, warehouse) the stock_movements.quantity_after chain,
+    read in id order, starts from zero, adds up step by step and ends at the
+    stock quantity.
+
+The script creates its own warehouses and products (SKU prefix STRESS-) and
+removes them afterwards unless --keep is given.
+
+    python benchmarks/stress_stock_concurrency.py --threads 16 --documents 200
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models.database import mysql
+from models.operations import Operations
+from models.document_state import DocumentStates
+
+
+def setup_fixtures(products, warehouses):
+    tag = uuid.uuid4().hex[:8]
+    cursor = mysql.connection.cursor()
+    warehouse_ids = []
+    for i in range(warehouses):
+        cursor.execute('INSERT INTO warehouses (name, location) VALUES (%s, %s)', (f'STRESS-{tag}-{i}', 'stress'))
+        warehouse_ids.append(cursor.lastrowid)
+    product_ids = []
+    for i in range(products):
+        cursor.execute('INSERT INTO products (name, sku) VALUES (%s, %s)', (f'Stress {i}', f'STRESS-{tag}-{i}'))
+        product_ids.append(cursor.lastrowid)
+    mysql.connection.commit()
+    cursor.close()
+    return product_ids, warehouse_ids
+
+
+def cleanup_fixtures(product_ids, warehouse_ids):
+    cursor = mysql.connection.cursor()
+    products = ', '.join(['%s'] * len(product_ids))
+    # Reservations live on the stock rows, so deleting them drops those too
+    for table in ('stock_movements', 'stock', 'low_stock_alerts', 'stock_line_daily', 'stock_line_stats'):
+        cursor.execute(f'DELETE FROM {table} WHERE product_id IN ({products})', product_ids)
+    for table in ('receipt_items', 'delivery_order_items', 'internal_transfer_items'):
+        cursor.execute(f'DELETE FROM {table} WHERE product_id IN ({products})', product_ids)
+    warehouses = ', '.join(['%s'] * len(warehouse_ids))
+    cursor.execute('DELETE FROM receipts WHERE supplier = %s AND id NOT IN (SELECT receipt_id FROM receipt_items)', ('stress',))
+    cursor.execute('DELETE FROM delivery_orders WHERE customer = %s AND id NOT IN (SELECT delivery_order_id FROM delivery_order_items)', ('stress',))
+    cursor.execute(f'DELETE FROM internal_transfers WHERE from_warehouse_id IN ({warehouses})', warehouse_ids)
+    cursor.execute(f'DELETE FROM products WHERE id IN ({products})', product_ids)
+    cursor.execute(f'DELETE FROM warehouses WHERE id IN ({warehouses})', warehouse_ids)
+    mysql.connection.commit()
+    cursor.close()
+
+
+def worker(app, product_ids, warehouse_ids, documents, expected, lock, stats):
+    local, outcomes = Counter(), Counter()
+    with app.app_context():
+        for _ in range(documents):
+            lines = random.sample(product_ids, random.randint(1, len(product_ids)))
+            items = [{'product_id': pid, 'quantity': random.randint(1, 20)} for pid in lines]
+            kind = random.choice(('receipt', 'delivery', 'transfer'))
+            try:
+                if kind == 'receipt':
+                    warehouse_id = random.choice(warehouse_ids)
+                    fields = {'supplier': 'stress', 'warehouse_id': warehouse_id}
+                    moves = [((item['product_id'], warehouse_id), item['quantity']) for item in items]
+                elif kind == 'delivery':
+                    warehouse_id = random.choice(warehouse_ids)
+                    fields = {'customer': 'stress', 'warehouse_id': warehouse_id}
+                    moves = [((item['product_id'], warehouse_id), -item['quantity']) for item in items]
+                else:
+                    source, target = random.sample(warehouse_ids, 2)
+                    fields = {'from_warehouse_id': source, 'to_warehouse_id': target}
+                    moves = [((item['product_id'], warehouse_id), sign * item['quantity'])
+                             for item in items for warehouse_id, sign in ((source, -1), (target, 1))]
+                document_id, _ = Operations.create(kind, items=items, created_by=None, **fields)
+
+                # Outgoing documents ship only when all their stock could be reserved
+                status = 'ready'
+                if kind != 'receipt':
+                    status = DocumentStates.transition(kind, 'confirm', [document_id])[0]['status']
+                if status == 'ready':
+                    result = DocumentStates.transition(kind, 'validate', [document_id])[0]
+                    if result['ok']:
+                        for key, quantity in moves:
+                            local[key] += quantity
+                    else:
+                        # Not on hand after all: give the reservation back
+                        DocumentStates.transition(kind, 'cancel', [document_id])
+                        outcomes['refused'] += 1
+                else:
+                    outcomes['waiting'] += 1
+                outcomes['committed'] += 1
+            except Exception as e:
+                outcomes['failed'] += 1
+                print(f"❌ {kind} failed: {e}")
+    with lock:
+        expected.update(local)
+        stats.update(outcomes)
+
+
+def verify(product_ids, expected):
+    errors = []
+    cursor = mysql.connection.cursor()
+    products = ', '.join(['%s'] * len(product_ids))
+
+    cursor.execute(f'SELECT product_id, warehouse_id, quantity, reserved FROM stock WHERE product_id IN ({products})', product_ids)
+    rows = cursor.fetchall()
+    actual = {(row[0], row[1]): row[2] for row in rows}
+    for product_id, warehouse_id, quantity, reserved in rows:
+        if reserved != 0:
+            errors.append(f"stock {(product_id, warehouse_id)}: {reserved} still reserved after every ready document was validated")
+    for key in set(actual) | set(expected):
+        if actual.get(key, 0) != expected.get(key, 0):
+            errors.append(f"stock {key}: expected {expected.get(key, 0)}, found {actual.get(key, 0)}")
+
+    cursor.execute(f'''
+        SELECT product_id, warehouse_id, quantity_change, quantity_after FROM stock_movements
+        WHERE product_id IN ({products}) ORDER BY id
+    ''', product_ids)
+    running = {}
+    for product_id, warehouse_id, change, after in cursor.fetchall():
+        key = (product_id, warehouse_id)
+        running[key] = running.get(key, 0) + change
+        if running[key] != after:
+            errors.append(f"movement chain {key}: quantity_after {after}, expected {running[key]}")
+            running[key] = after
+    for key, quantity in actual.items():
+        if running.get(key, 0) != quantity:
+            errors.append(f"movement chain {key}: ends at {running.get(key, 0)}, stock is {quantity}")
+    cursor.close()
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--documents', type=int, default=100, help='documents per thread')
+    parser.add_argument('--products', type=int, default=8, help='hot products shared by all threads')
+    parser.add_argument('--warehouses', type=int, default=3)
+    parser.add_argument('--keep', action='store_true', help='keep the generated rows')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        product_ids, warehouse_ids = setup_fixtures(args.products, args.warehouses)
+
+    expected, lock, stats = Counter(), threading.Lock(), Counter()
+    threads = [threading.Thread(target=worker, args=(app, product_ids, warehouse_ids, args.documents, expected, lock, stats))
+               for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        errors = verify(product_ids, expected)
+        if not args.keep:
+            cleanup_fixtures(product_ids, warehouse_ids)
+
+    print(f"📊 {stats['committed']} documents committed, {stats['failed']} failed in {elapsed:.1f}s "
+          f"({stats['committed'] / elapsed:.0f} docs/s); "
+          f"{stats['waiting']} left waiting for stock, {stats['refused']} refused at validation")
+    if errors:
+        for error in errors[:20]:
+            print(f"❌ {error}")
+        sys.exit(f"{len(errors)} consistency errors")
+    print("✅ Stock quantities and movement chains are consistent")
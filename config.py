@@ -1,4 +1,3 @@
-<<<<<<< HEAD
 import os
 from dotenv import load_dotenv
 
@@ -13,20 +12,56 @@ class Config:
     MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
     # Add connection timeout and pool settings
     MYSQL_CONNECT_TIMEOUT = 10
-=======
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-class Config:
-    SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-this')
-    MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
-    MYSQL_USER = os.getenv('MYSQL_USER', 'root')
-    MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', 'root')
-    MYSQL_DB = os.getenv('MYSQL_DB', 'inventory_management')
-    MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
-    # Add connection timeout and pool settings
-    MYSQL_CONNECT_TIMEOUT = 10
->>>>>>> ad037788d016f07a4048a89b262d999f5d561f95
-    MYSQL_READ_DEFAULT_FILE = '/etc/my.cnf'
\ No newline at end of file
+    MYSQL_READ_DEFAULT_FILE = '/etc/my.cnf'
+    MYSQL_POOL_MIN_SIZE = int(os.getenv('MYSQL_POOL_MIN_SIZE', 2))
+    MYSQL_POOL_MAX_SIZE = int(os.getenv('MYSQL_POOL_MAX_SIZE', 10))
+    MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', 10))          # seconds to wait for a free connection
+    MYSQL_POOL_RECYCLE = int(os.getenv('MYSQL_POOL_RECYCLE', 3600))          # reconnect after this many seconds
+    MYSQL_POOL_PING_INTERVAL = int(os.getenv('MYSQL_POOL_PING_INTERVAL', 30))  # ping connections idle longer than this
+    # Replays of transactions aborted by InnoDB deadlocks / lock wait timeouts
+    MYSQL_DEADLOCK_RETRIES = int(os.getenv('MYSQL_DEADLOCK_RETRIES', 5))
+    MYSQL_DEADLOCK_BACKOFF = float(os.getenv('MYSQL_DEADLOCK_BACKOFF', 0.02))
+    # Cached database health probe
+    DB_HEALTH_TTL = float(os.getenv('DB_HEALTH_TTL', 5))
+    DB_HEALTH_FAILURE_THRESHOLD = int(os.getenv('DB_HEALTH_FAILURE_THRESHOLD', 2))
+    DB_HEALTH_RECOVERY_THRESHOLD = int(os.getenv('DB_HEALTH_RECOVERY_THRESHOLD', 2))
+    # Per-process cache of users loaded for authenticated requests
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60))
+    # Dashboard KPI counters: row slots per counter and full recount period (seconds)
+    KPI_SLOTS = int(os.getenv('KPI_SLOTS', 8))
+    KPI_RECOUNT_INTERVAL = int(os.getenv('KPI_RECOUNT_INTERVAL', 3600))
+    # Rows per transaction for bulk product imports
+    PRODUCT_IMPORT_CHUNK_SIZE = int(os.getenv('PRODUCT_IMPORT_CHUNK_SIZE', 1000))
+    # Document reference numbers reserved per database round trip
+    REFERENCE_BLOCK_SIZE = int(os.getenv('REFERENCE_BLOCK_SIZE', 100))
+    # Stock snapshots end this many seconds in the past (longer than any write transaction)
+    SNAPSHOT_LAG = int(os.getenv('SNAPSHOT_LAG', 300))
+    # Archive stock movements and closed documents older than this, in batches of ARCHIVE_BATCH_SIZE rows
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 1000))
+    # Queue submitted documents for the workers (python -m models.operation_queue) instead of writing them in the request
+    ASYNC_OPERATIONS = os.getenv('ASYNC_OPERATIONS', 'false').lower() in ('1', 'true', 'yes')
+    OPERATION_QUEUE_BATCH_SIZE = int(os.getenv('OPERATION_QUEUE_BATCH_SIZE', 100))
+    OPERATION_QUEUE_POLL_INTERVAL = float(os.getenv('OPERATION_QUEUE_POLL_INTERVAL', 0.2))
+    # SQL instrumentation: slow statement threshold, repeats per request flagged as N+1,
+    # X-DB-* response headers (always on in debug mode), level of the JSON log
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+    SQL_DEBUG_HEADERS = os.getenv('SQL_DEBUG_HEADERS', 'false').lower() in ('1', 'true', 'yes')
+    SQL_LOG_LEVEL = os.getenv('SQL_LOG_LEVEL', 'INFO')
+    # Bearer token required by /metrics (empty: open, e.g. behind a private network)
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    # gzip responses of at least GZIP_MIN_SIZE bytes
+    GZIP_MIN_SIZE = int(os.getenv('GZIP_MIN_SIZE', 1024))
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+    # Replenishment: days of delivery history for daily usage, supplier lead time,
+    # safety stock and review period (days of usage ordered on top of the reorder point)
+    REPLENISHMENT_WINDOW_DAYS = int(os.getenv('REPLENISHMENT_WINDOW_DAYS', 30))
+    REPLENISHMENT_LEAD_TIME_DAYS = float(os.getenv('REPLENISHMENT_LEAD_TIME_DAYS', 7))
+    REPLENISHMENT_SAFETY_DAYS = float(os.getenv('REPLENISHMENT_SAFETY_DAYS', 3))
+    REPLENISHMENT_REVIEW_DAYS = float(os.getenv('REPLENISHMENT_REVIEW_DAYS', 14))
+    # Weight of the newest day in the moving average of daily outflow per stock line
+    CONSUMPTION_EWMA_ALPHA = float(os.getenv('CONSUMPTION_EWMA_ALPHA', 0.1))
+    # Apply pending schema migrations at startup (development); otherwise run `python -m models.migrations`
+    AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', 'false').lower() in ('1', 'true', 'yes')
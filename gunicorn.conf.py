@@ -0,0 +1,37 @@
+# Gunicorn settings for production: gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Requests spend most of their time waiting on MySQL, so each worker runs a
+# few threads. Every thread can hold one pooled connection, and reserving a
+# block of document numbers briefly takes one more per document prefix (four):
+# keep threads + 4 at or below MYSQL_POOL_MAX_SIZE.
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Import and build the app once in the master; workers share that memory
+# copy-on-write. create_app() opens no connections, so nothing is inherited.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# Recycle workers now and then to cap memory growth, staggered so they do not restart together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+
+
+def post_worker_init(worker):
+    # Open this worker's pool and check the schema before it takes traffic
+    from models.database import mysql
+    from app import startup_check
+
+    app = worker.wsgi
+    with app.app_context():
+        startup_check(app)
+    worker.log.info("Worker %s ready: %s", worker.pid, mysql.pool.stats())
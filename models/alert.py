@@ -0,0 +1,113 @@
+from models.database import mysql
+import MySQLdb.cursors
+
+class LowStockAlert:
+    """Precomputed set of stock lines below their product's min_stock_level.
+
+    Rows are added or removed only when a stock line crosses the minimum, by
+    the same transaction that moves the stock, so reading alerts never joins
+    stock against products. Lock order is always stock rows, then alert rows,
+    then KPI counters.
+    """
+
+    @staticmethod
+    def apply_crossings(cursor, lines):
+        """Record threshold crossings for stock lines changed in this transaction.
+
+        `lines` holds (product_id, warehouse_id, quantity_before, quantity_after,
+        min_stock_level) tuples. Returns the change in the number of alerts.
+        """
+        below = sorted((product_id, warehouse_id, after, min_level)
+                       for product_id, warehouse_id, before, after, min_level in lines
+                       if after < min_level)
+        recovered = sorted((product_id, warehouse_id)
+                           for product_id, warehouse_id, before, after, min_level in lines
+                           if before < min_level <= after)
+        if below:
+            cursor.executemany('''
+                INSERT INTO low_stock_alerts (product_id, warehouse_id, quantity, min_stock_level)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE quantity = VALUES(quantity), min_stock_level = VALUES(min_stock_level)
+            ''', below)
+        if recovered:
+            cursor.execute('''
+                DELETE FROM low_stock_alerts
+                WHERE (product_id, warehouse_id) IN (%s)
+            ''' % ', '.join(['(%s, %s)'] * len(recovered)), [value for key in recovered for value in key])
+        return sum((after < min_level) - (before < min_level)
+                   for product_id, warehouse_id, before, after, min_level in lines)
+
+    @staticmethod
+    def reevaluate_products(cursor, product_ids):
+        """Rebuild the alerts of products whose min_stock_level changed.
+
+        Returns the change in the number of alerts.
+        """
+        product_ids = sorted({int(product_id) for product_id in product_ids})
+        if not product_ids:
+            return 0
+        placeholders = ', '.join(['%s'] * len(product_ids))
+
+        # Lock the stock lines first to keep the stock -> alerts lock order
+        cursor.execute(f'''
+            SELECT s.product_id, s.warehouse_id, s.quantity, COALESCE(p.min_stock_level, 0)
+            FROM stock s
+            JOIN products p ON p.id = s.product_id
+            WHERE s.product_id IN ({placeholders})
+            ORDER BY s.product_id, s.warehouse_id
+            FOR SHARE OF s
+        ''', product_ids)
+        below = [row for row in cursor.fetchall() if row[2] < row[3]]
+
+        cursor.execute(f'DELETE FROM low_stock_alerts WHERE product_id IN ({placeholders})', product_ids)
+        removed = cursor.rowcount
+        if below:
+            cursor.executemany('''
+                INSERT INTO low_stock_alerts (product_id, warehouse_id, quantity, min_stock_level)
+                VALUES (%s, %s, %s, %s)
+            ''', below)
+        return len(below) - removed
+
+    @staticmethod
+    def rebuild():
+        """Recompute the whole alert set from stock; used to correct drift."""
+        mysql.connection.rollback()
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('DELETE FROM low_stock_alerts')
+            cursor.execute('''
+                SELECT s.product_id, s.warehouse_id, s.quantity, p.min_stock_level
+                FROM stock s
+                JOIN products p ON p.id = s.product_id
+                WHERE s.quantity < p.min_stock_level
+                ORDER BY s.product_id, s.warehouse_id
+            ''')
+            below = cursor.fetchall()
+            if below:
+                cursor.executemany('''
+                    INSERT INTO low_stock_alerts (product_id, warehouse_id, quantity, min_stock_level)
+                    VALUES (%s, %s, %s, %s)
+                ''', below)
+            mysql.connection.commit()
+            return len(below)
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def get_all(limit=50):
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute('''
+            SELECT a.product_id, a.warehouse_id, a.quantity, a.min_stock_level, a.flagged_at,
+                   p.name, p.sku, w.name as warehouse_name
+            FROM low_stock_alerts a
+            JOIN products p ON p.id = a.product_id
+            JOIN warehouses w ON w.id = a.warehouse_id
+            ORDER BY a.flagged_at DESC
+            LIMIT %s
+        ''', (limit,))
+        alerts = cursor.fetchall()
+        cursor.close()
+        return alerts
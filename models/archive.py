@@ -0,0 +1,197 @@
+from models.database import mysql, retry_on_deadlock
+from models.consumption import ConsumptionStats
+import argparse
+import time
+from datetime import datetime, timedelta
+
+# Archive tables are created LIKE their hot table (same columns and indexes,
+# no foreign keys), so rows move with INSERT ... SELECT * and keep their ids.
+# A migration that alters a hot table must alter its archive table too.
+ARCHIVE_SUFFIX = '_archive'
+
+# Closed documents: header table -> (items table, column referencing the header)
+DOCUMENT_ITEMS = {
+    'receipts': ('receipt_items', 'receipt_id'),
+    'delivery_orders': ('delivery_order_items', 'delivery_order_id'),
+    'internal_transfers': ('internal_transfer_items', 'transfer_id'),
+    'stock_adjustments': ('stock_adjustment_items', 'adjustment_id'),
+}
+# Documents in these states never change again; adjustments have no status
+CLOSED_STATUSES = ('done', 'canceled')
+UNSTATUSED_DOCUMENTS = ('stock_adjustments',)
+
+class Archive:
+    """Moves old stock movements and closed documents out of the hot tables.
+
+    Rows older than AFTER_DAYS are copied to <table>_archive and deleted in
+    batches of BATCH_SIZE, one short transaction per batch, so only the rows
+    of the current batch are ever locked. Archived movements are also rolled
+    up into stock_movement_daily. Readers (move history, snapshots, KPI
+    recounts) query both tiers, so archiving changes where rows live but not
+    any result.
+
+    Run it from cron: python -m models.archive [--days N]
+    """
+    AFTER_DAYS = 365
+    BATCH_SIZE = 1000
+    # Pause between batches so purge and replicas keep up
+    BATCH_PAUSE = 0.05
+
+    @staticmethod
+    def init_app(app):
+        Archive.AFTER_DAYS = app.config.get('ARCHIVE_AFTER_DAYS', Archive.AFTER_DAYS)
+        Archive.BATCH_SIZE = app.config.get('ARCHIVE_BATCH_SIZE', Archive.BATCH_SIZE)
+
+    @staticmethod
+    def run(days=None):
+        """Archive everything older than `days` (default AFTER_DAYS). Returns rows moved per table."""
+        before = datetime.now() - timedelta(days=Archive.AFTER_DAYS if days is None else days)
+        report = {}
+        cursor = mysql.connection.cursor()
+        cursor.execute("SELECT GET_LOCK('archive', 0)")
+        locked = cursor.fetchone()[0]
+        cursor.close()
+        if not locked:
+            raise RuntimeError('Another archive run is in progress')
+        try:
+            report['stock_movements'] = Archive._drain(Archive._archive_movements, before)
+            for table in DOCUMENT_ITEMS:
+                report[table] = Archive._drain(Archive._archive_documents, table, before)
+            report['operation_queue'] = Archive._drain(Archive._purge_queue, before)
+            report['stock_line_daily'] = Archive._drain(ConsumptionStats.purge_buckets, Archive.BATCH_SIZE)
+        finally:
+            cursor = mysql.connection.cursor()
+            cursor.execute("SELECT RELEASE_LOCK('archive')")
+            cursor.fetchone()
+            cursor.close()
+        print(f"✅ Archived rows older than {before:%Y-%m-%d}: {report}")
+        return report
+
+    @staticmethod
+    def _drain(batch, *args):
+        total = 0
+        while True:
+            moved = batch(*args)
+            total += moved
+            if moved < Archive.BATCH_SIZE:
+                return total
+            time.sleep(Archive.BATCH_PAUSE)
+
+    @staticmethod
+    @retry_on_deadlock
+    def _archive_movements(before):
+        cursor = mysql.connection.cursor()
+        try:
+            # Oldest movements first (range scan on idx_movements_created)
+            cursor.execute('''
+                SELECT id FROM stock_movements
+                WHERE created_at < %s
+                ORDER BY created_at, id
+                LIMIT %s
+            ''', (before, Archive.BATCH_SIZE))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return 0
+            placeholders = ', '.join(['%s'] * len(ids))
+
+            cursor.execute(f'''
+                INSERT INTO stock_movements_archive
+                SELECT * FROM stock_movements WHERE id IN ({placeholders})
+            ''', ids)
+            cursor.execute(f'''
+                INSERT INTO stock_movement_daily (day, product_id, warehouse_id, movement_type,
+                                                  quantity_in, quantity_out, movement_count)
+                SELECT DATE(created_at), product_id, warehouse_id, movement_type,
+                       SUM(GREATEST(quantity_change, 0)), SUM(GREATEST(-quantity_change, 0)), COUNT(*)
+                FROM stock_movements
+                WHERE id IN ({placeholders})
+                GROUP BY DATE(created_at), product_id, warehouse_id, movement_type
+                ON DUPLICATE KEY UPDATE quantity_in = quantity_in + VALUES(quantity_in),
+                    quantity_out = quantity_out + VALUES(quantity_out),
+                    movement_count = movement_count + VALUES(movement_count)
+            ''', ids)
+            cursor.execute(f'DELETE FROM stock_movements WHERE id IN ({placeholders})', ids)
+
+            mysql.connection.commit()
+            return len(ids)
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    @retry_on_deadlock
+    def _archive_documents(table, before):
+        items_table, foreign_key = DOCUMENT_ITEMS[table]
+        cursor = mysql.connection.cursor()
+        try:
+            conditions, params = ['created_at < %s'], [before]
+            if table not in UNSTATUSED_DOCUMENTS:
+                conditions.append('status IN (%s)' % ', '.join(['%s'] * len(CLOSED_STATUSES)))
+                params.extend(CLOSED_STATUSES)
+            cursor.execute(f'''
+                SELECT id FROM {table}
+                WHERE {' AND '.join(conditions)}
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE
+            ''', params + [Archive.BATCH_SIZE])
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return 0
+            placeholders = ', '.join(['%s'] * len(ids))
+
+            # Items reference their header, so they are copied with it and deleted first
+            cursor.execute(f'INSERT INTO {table}{ARCHIVE_SUFFIX} SELECT * FROM {table} WHERE id IN ({placeholders})', ids)
+            cursor.execute(f'''
+                INSERT INTO {items_table}{ARCHIVE_SUFFIX}
+                SELECT * FROM {items_table} WHERE {foreign_key} IN ({placeholders})
+            ''', ids)
+            cursor.execute(f'DELETE FROM {items_table} WHERE {foreign_key} IN ({placeholders})', ids)
+            cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids)
+
+            mysql.connection.commit()
+            return len(ids)
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _purge_queue(before):
+        # Processed queue entries are only kept for polling; the documents themselves are archived above
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('''
+                DELETE FROM operation_queue
+                WHERE status IN ('done', 'failed') AND processed_at < %s
+                ORDER BY id
+                LIMIT %s
+            ''', (before, Archive.BATCH_SIZE))
+            mysql.connection.commit()
+            return cursor.rowcount
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+def main():
+    from flask import Flask
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Archive old stock movements and closed documents')
+    parser.add_argument('--days', type=int, help='archive rows older than this many days (default: ARCHIVE_AFTER_DAYS)')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    mysql.init_app(app)
+    Archive.init_app(app)
+    with app.app_context():
+        Archive.run(args.days)
+
+if __name__ == '__main__':
+    main()
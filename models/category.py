@@ -0,0 +1,11 @@
+from models.database import mysql
+import MySQLdb.cursors
+
+class Category:
+    @staticmethod
+    def get_all():
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute('SELECT * FROM product_categories ORDER BY name')
+        categories = cursor.fetchall()
+        cursor.close()
+        return categories
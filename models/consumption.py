@@ -0,0 +1,136 @@
+from models.database import mysql
+import MySQLdb.cursors
+from datetime import date
+
+class ConsumptionStats:
+    """Running inflow/outflow statistics per stock line.
+
+    apply_stock_deltas folds every batch of movements into two small tables
+    in the same transaction, after the stock rows are written:
+
+      * stock_line_stats, one row per line: last movement time, the current
+        day's inflow and outflow, and an exponentially weighted moving
+        average of daily outflow over completed days;
+      * stock_line_daily, one row per line and day with movements: inflow and
+        outflow, kept for WINDOW_DAYS.
+
+    When the first movement of a new day reaches a line, the previous day's
+    outflow is folded into the average and the days without movements in
+    between decay it. Reading a line is one primary-key row plus at most
+    WINDOW_DAYS bucket rows from a primary-key range, whatever the size of
+    the movement ledger.
+    """
+    ALPHA = 0.1
+    WINDOW_DAYS = 30
+    SHORT_WINDOW_DAYS = 7
+    MAX_LIMIT = 500
+
+    @staticmethod
+    def init_app(app):
+        ConsumptionStats.ALPHA = float(app.config.get('CONSUMPTION_EWMA_ALPHA', ConsumptionStats.ALPHA))
+
+    @staticmethod
+    def apply(cursor, deltas):
+        """Record movements of this transaction; `deltas` are StockDelta tuples."""
+        flows = {}
+        for delta in deltas:
+            key = (int(delta.product_id), int(delta.warehouse_id))
+            inflow, outflow = flows.get(key, (0, 0))
+            change = delta.quantity_change
+            flows[key] = (inflow + max(change, 0), outflow + max(-change, 0))
+        rows = [(product_id, warehouse_id, inflow, outflow)
+                for (product_id, warehouse_id), (inflow, outflow) in sorted(flows.items())]
+        if not rows:
+            return
+
+        cursor.executemany('''
+            INSERT INTO stock_line_daily (product_id, warehouse_id, day, quantity_in, quantity_out)
+            VALUES (%s, %s, CURDATE(), %s, %s)
+            ON DUPLICATE KEY UPDATE quantity_in = quantity_in + VALUES(quantity_in),
+                quantity_out = quantity_out + VALUES(quantity_out)
+        ''', rows)
+
+        # Assignments run left to right: the average and day totals read the
+        # stored day before it moves forward
+        alpha = float(ConsumptionStats.ALPHA)
+        cursor.executemany('''
+            INSERT INTO stock_line_stats (product_id, warehouse_id, day, day_inflow, day_outflow, ewma_outflow, last_movement_at)
+            VALUES (%%s, %%s, CURDATE(), %%s, %%s, 0, NOW())
+            ON DUPLICATE KEY UPDATE
+                ewma_outflow = IF(VALUES(day) > day,
+                    (%(alpha)r * day_outflow + (1 - %(alpha)r) * ewma_outflow)
+                        * POW(1 - %(alpha)r, DATEDIFF(VALUES(day), day) - 1),
+                    ewma_outflow),
+                day_inflow = IF(VALUES(day) > day, VALUES(day_inflow), day_inflow + VALUES(day_inflow)),
+                day_outflow = IF(VALUES(day) > day, VALUES(day_outflow), day_outflow + VALUES(day_outflow)),
+                day = GREATEST(day, VALUES(day)),
+                last_movement_at = VALUES(last_movement_at)
+        ''' % {'alpha': alpha}, rows)
+
+    @staticmethod
+    def ewma_as_of(stats, today):
+        """Average daily outflow through yesterday, folding in days not yet folded."""
+        days = (today - stats['day']).days
+        if days <= 0:
+            return stats['ewma_outflow']
+        alpha = ConsumptionStats.ALPHA
+        folded = alpha * stats['day_outflow'] + (1 - alpha) * stats['ewma_outflow']
+        return folded * (1 - alpha) ** (days - 1)
+
+    @staticmethod
+    def get(product_id=None, warehouse_id=None, limit=100):
+        """Statistics of the lines of a product and/or warehouse."""
+        if not product_id and not warehouse_id:
+            raise ValueError('product or warehouse is required')
+        limit = max(1, min(int(limit), ConsumptionStats.MAX_LIMIT))
+        conditions, params = [], []
+        for column, value in (('st.product_id', product_id), ('st.warehouse_id', warehouse_id)):
+            if value:
+                conditions.append(f'{column} = %s')
+                params.append(int(value))
+
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute(f'''
+            SELECT st.product_id, st.warehouse_id, st.day, st.day_outflow, st.ewma_outflow, st.last_movement_at,
+                   CAST(COALESCE(SUM(IF(d.day > CURDATE() - INTERVAL %s DAY, d.quantity_in, 0)), 0) AS SIGNED) as inflow_7d,
+                   CAST(COALESCE(SUM(IF(d.day > CURDATE() - INTERVAL %s DAY, d.quantity_out, 0)), 0) AS SIGNED) as outflow_7d,
+                   CAST(COALESCE(SUM(d.quantity_in), 0) AS SIGNED) as inflow_30d,
+                   CAST(COALESCE(SUM(d.quantity_out), 0) AS SIGNED) as outflow_30d
+            FROM stock_line_stats st
+            LEFT JOIN stock_line_daily d
+              ON d.product_id = st.product_id AND d.warehouse_id = st.warehouse_id
+             AND d.day > CURDATE() - INTERVAL %s DAY
+            WHERE {' AND '.join(conditions)}
+            GROUP BY st.product_id, st.warehouse_id
+            ORDER BY st.product_id, st.warehouse_id
+            LIMIT %s
+        ''', [ConsumptionStats.SHORT_WINDOW_DAYS, ConsumptionStats.SHORT_WINDOW_DAYS,
+              ConsumptionStats.WINDOW_DAYS] + params + [limit])
+        lines = cursor.fetchall()
+        cursor.close()
+
+        today = date.today()
+        for line in lines:
+            line['ewma_daily_outflow'] = round(ConsumptionStats.ewma_as_of(line, today), 3)
+            for key in ('day', 'day_outflow', 'ewma_outflow'):
+                line.pop(key)
+        return lines
+
+    @staticmethod
+    def purge_buckets(limit):
+        """Delete one batch of daily buckets older than the window. Returns rows deleted."""
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('''
+                DELETE FROM stock_line_daily
+                WHERE day <= CURDATE() - INTERVAL %s DAY
+                ORDER BY day
+                LIMIT %s
+            ''', (ConsumptionStats.WINDOW_DAYS, limit))
+            mysql.connection.commit()
+            return cursor.rowcount
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
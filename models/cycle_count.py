@@ -0,0 +1,230 @@
+from models.database import mysql, retry_on_deadlock
+from models.operations import Operations
+import MySQLdb.cursors
+
+CONFLICT_POLICIES = ('skip', 'rebase')
+
+class CycleCount:
+    """Cycle-count sessions that turn scanned quantities into one stock adjustment.
+
+    Starting a session records the current end of the stock_movements ledger.
+    Scanners then stream counted (product_id, warehouse_id, quantity) lines,
+    stored with multi-row upserts (a rescan replaces the earlier count).
+    Applying reads every counted line against its locked stock row with one
+    join, and the movements logged on those lines after they were scanned
+    with one range read of the ledger's primary key from the session start.
+    Only lines whose count differs from the recorded quantity become
+    adjustment items, all created and applied through one
+    Operations.create_documents call and one commit.
+
+    A line that moved after it was scanned is a conflict: by default it is
+    reported and left alone so it can be recounted; with on_conflict='rebase'
+    the count is taken as of its scan and the movements since then are added
+    on top of it. Movements before the scan are already on the shelf the
+    count saw, so they are neither conflicts nor added again.
+
+    Counted lines below their reserved quantity are applied anyway (the
+    count is what is on the shelf) and reported as shortages: the documents
+    holding those reservations are refused at validation until stock is
+    back, see DocumentStates.check_on_hand.
+
+    Movements whose transaction committed after the session started but had
+    allocated their id before it are not seen as conflicts; that window is
+    as long as one stock transaction.
+    """
+    LINE_BATCH_SIZE = 1000
+    MAX_REPORTED_CONFLICTS = 1000
+
+    @staticmethod
+    def start(created_by, warehouse_id=None, reason=None):
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM stock_movements')
+            started_movement_id = cursor.fetchone()[0]
+            cursor.execute('''
+                INSERT INTO cycle_counts (warehouse_id, reason, started_movement_id, created_by)
+                VALUES (%s, %s, %s, %s)
+            ''', (warehouse_id, reason, started_movement_id, created_by))
+            count_id = cursor.lastrowid
+            mysql.connection.commit()
+            return count_id
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def get(count_id):
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute('''
+            SELECT c.*, (SELECT COUNT(*) FROM cycle_count_lines l WHERE l.count_id = c.id) as counted_lines
+            FROM cycle_counts c
+            WHERE c.id = %s
+        ''', (count_id,))
+        session = cursor.fetchone()
+        cursor.close()
+        return session
+
+    @staticmethod
+    def parse_lines(lines, warehouse_id=None):
+        """Validate counted lines into (product_id, warehouse_id, quantity) tuples."""
+        parsed = []
+        for index, line in enumerate(lines):
+            try:
+                product_id = int(line['product_id'])
+                line_warehouse_id = int(line.get('warehouse_id') or warehouse_id)
+                quantity = int(line['quantity'])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"line {index}: product_id, warehouse_id and quantity must be numbers")
+            if quantity < 0:
+                raise ValueError(f"line {index}: quantity must not be negative")
+            if warehouse_id and line_warehouse_id != int(warehouse_id):
+                raise ValueError(f"line {index}: this count only covers warehouse {warehouse_id}")
+            parsed.append((product_id, line_warehouse_id, quantity))
+        return parsed
+
+    @staticmethod
+    def add_lines(count_id, lines):
+        """Store counted lines of an open session. Returns the number of lines received."""
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('SELECT status, warehouse_id FROM cycle_counts WHERE id = %s FOR SHARE', (count_id,))
+            session = cursor.fetchone()
+            if session is None:
+                raise LookupError(f"Cycle count {count_id} not found")
+            if session[0] != 'open':
+                raise ValueError(f"Cycle count {count_id} is {session[0]}")
+            parsed = CycleCount.parse_lines(lines, session[1])
+
+            # Later scans of the same line in one upload win
+            rows = {(product_id, warehouse_id): quantity for product_id, warehouse_id, quantity in parsed}
+            rows = [(count_id, product_id, warehouse_id, quantity) for (product_id, warehouse_id), quantity in sorted(rows.items())]
+            for first in range(0, len(rows), CycleCount.LINE_BATCH_SIZE):
+                cursor.executemany('''
+                    INSERT INTO cycle_count_lines (count_id, product_id, warehouse_id, counted_quantity)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE counted_quantity = VALUES(counted_quantity), counted_at = CURRENT_TIMESTAMP
+                ''', rows[first:first + CycleCount.LINE_BATCH_SIZE])
+            mysql.connection.commit()
+            return len(parsed)
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    @retry_on_deadlock
+    def apply(count_id, created_by, on_conflict='skip'):
+        """Adjust stock to the counted quantities in one transaction. Returns a report."""
+        if on_conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}")
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('''
+                SELECT status, reason, started_movement_id FROM cycle_counts
+                WHERE id = %s FOR UPDATE
+            ''', (count_id,))
+            session = cursor.fetchone()
+            if session is None:
+                raise LookupError(f"Cycle count {count_id} not found")
+            status, reason, started_movement_id = session
+            if status != 'open':
+                raise ValueError(f"Cycle count {count_id} is {status}")
+
+            # Counted lines with their recorded quantity, stock rows locked in key order
+            cursor.execute('''
+                SELECT l.product_id, l.warehouse_id, l.counted_quantity, s.quantity, s.reserved
+                FROM cycle_count_lines l
+                LEFT JOIN stock s ON s.product_id = l.product_id AND s.warehouse_id = l.warehouse_id
+                WHERE l.count_id = %s
+                ORDER BY l.product_id, l.warehouse_id
+                FOR UPDATE OF s
+            ''', (count_id,))
+            lines = cursor.fetchall()
+
+            # Net movement per counted line since it was (last) scanned
+            cursor.execute('''
+                SELECT m.product_id, m.warehouse_id, SUM(m.quantity_change), COUNT(*)
+                FROM stock_movements m
+                JOIN cycle_count_lines l
+                  ON l.count_id = %s AND l.product_id = m.product_id AND l.warehouse_id = m.warehouse_id
+                WHERE m.id > %s AND m.created_at > l.counted_at
+                GROUP BY m.product_id, m.warehouse_id
+            ''', (count_id, started_movement_id))
+            moved = {(row[0], row[1]): (int(row[2]), row[3]) for row in cursor.fetchall()}
+
+            items, conflicts, shortages, unchanged = [], [], [], 0
+            for product_id, warehouse_id, counted, quantity, reserved in lines:
+                quantity = quantity or 0
+                reserved = reserved or 0
+                new_quantity = counted
+                if (product_id, warehouse_id) in moved:
+                    change, moves = moved[(product_id, warehouse_id)]
+                    if len(conflicts) < CycleCount.MAX_REPORTED_CONFLICTS:
+                        conflicts.append({'product_id': product_id, 'warehouse_id': warehouse_id,
+                                          'counted': counted, 'quantity_at_count': quantity - change,
+                                          'quantity': quantity, 'movements': moves,
+                                          'resolution': on_conflict})
+                    if on_conflict == 'skip':
+                        continue
+                    new_quantity = counted + change
+                if new_quantity == quantity:
+                    unchanged += 1
+                    continue
+                if new_quantity < reserved:
+                    shortages.append({'product_id': product_id, 'warehouse_id': warehouse_id,
+                                      'new_quantity': new_quantity, 'reserved': reserved})
+                items.append({'product_id': product_id, 'warehouse_id': warehouse_id,
+                              'current_quantity': quantity, 'new_quantity': new_quantity})
+
+            adjustment_id = reference = None
+            movement_count = 0
+            if items:
+                created, movement_count = Operations.create_documents([('adjustment', {
+                    'reason': reason or f'Cycle count {count_id}', 'items': items, 'created_by': created_by,
+                })])
+                adjustment_id, reference = created[0]
+
+            conflict_count = len(moved)
+            cursor.execute('''
+                UPDATE cycle_counts
+                SET status = 'applied', adjustment_id = %s, adjusted_lines = %s, conflict_lines = %s,
+                    applied_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (adjustment_id, len(items), conflict_count, count_id))
+            mysql.connection.commit()
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+        if items:
+            Operations.count_committed(['adjustment'], movement_count)
+        return {
+            'id': count_id,
+            'adjustment_id': adjustment_id,
+            'reference': reference,
+            'counted_lines': len(lines),
+            'adjusted_lines': len(items),
+            'unchanged_lines': unchanged,
+            'conflict_lines': conflict_count,
+            'conflicts': conflicts,
+            'shortages': shortages,
+        }
+
+    @staticmethod
+    def cancel(count_id):
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute("UPDATE cycle_counts SET status = 'canceled' WHERE id = %s AND status = 'open'", (count_id,))
+            canceled = cursor.rowcount
+            mysql.connection.commit()
+            return canceled == 1
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
@@ -1,208 +1,284 @@
-from flask_mysqldb import MySQL
+import MySQLdb
 import MySQLdb.cursors
-from flask import current_app
+from flask import current_app, g
+from models.instrumentation import InstrumentedConnection
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+import os
+import random
+import threading
+import time
+
+class PoolTimeout(MySQLdb.OperationalError):
+    """No pooled connection became free within MYSQL_POOL_TIMEOUT seconds."""
+
+class ConnectionPool:
+    """Thread-safe pool of MySQLdb connections.
+
+    Idle connections are reused LIFO so the warmest socket goes out first.
+    A connection older than `recycle` seconds is replaced on checkout, and one
+    that sat idle for more than `ping_interval` seconds is validated with a
+    COM_PING first. The pool notices a fork and starts over in the child
+    without touching the parent's sockets.
+    """
+
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, timeout=10.0, recycle=3600, ping_interval=30):
+        self.connect_kwargs = connect_kwargs
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._created = 0
+        self._closed = 0
+        self._timeouts = 0
+        self._checkouts = 0
+        self._wait_seconds = 0.0
+        self._filled = False
+
+    def _connect(self):
+        conn = InstrumentedConnection(MySQLdb.connect(**self.connect_kwargs))
+        now = time.monotonic()
+        with self._cond:
+            self._created += 1
+        return [conn, now, now]
+
+    def _close(self, entry):
+        try:
+            entry[0].close()
+        except Exception:
+            pass
+        with self._cond:
+            self._closed += 1
+
+    def _discard(self, entry):
+        self._close(entry)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _fill(self):
+        # Open min_size connections on first use, i.e. after any fork
+        self._filled = True
+        with self._cond:
+            missing = max(0, self.min_size - self._size)
+            self._size += missing
+        for opened in range(missing):
+            try:
+                entry = self._connect()
+            except Exception:
+                # Give back the slots not filled and retry on the next checkout
+                with self._cond:
+                    self._size -= missing - opened
+                    self._filled = False
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def acquire(self):
+        if self._pid != os.getpid():
+            with self._cond:
+                self._reset()
+        if not self._filled:
+            self._fill()
+
+        started = time.monotonic()
+        deadline = started + self.timeout
+        entry = None
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(2013, f"Timed out after {self.timeout}s waiting for a pooled MySQL connection")
+                    self._cond.wait(remaining)
+                self._in_use += 1
+                self._checkouts += 1
+                self._wait_seconds += time.monotonic() - started
+            finally:
+                self._waiting -= 1
+
+        # Replace aged or dead connections, keeping the reserved slot
+        try:
+            now = time.monotonic()
+            if entry is not None and now - entry[1] > self.recycle:
+                self._close(entry)
+                entry = None
+            elif entry is not None and now - entry[2] > self.ping_interval:
+                try:
+                    entry[0].ping()
+                except MySQLdb.Error:
+                    self._close(entry)
+                    entry = None
+            if entry is None:
+                entry = self._connect()
+        except Exception:
+            with self._cond:
+                if entry is None:
+                    self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return entry
+
+    def release(self, entry, discard=False):
+        if self._pid != os.getpid():
+            return
+        if not discard:
+            # Never hand an open transaction to the next borrower
+            try:
+                entry[0].rollback()
+            except MySQLdb.Error:
+                discard = True
+        with self._cond:
+            self._in_use -= 1
+        if discard:
+            self._discard(entry)
+            return
+        entry[2] = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection outside of a Flask app context."""
+        entry = self.acquire()
+        failed = False
+        try:
+            yield entry[0]
+        except MySQLdb.OperationalError:
+            failed = True
+            raise
+        finally:
+            self.release(entry, discard=failed)
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'created': self._created,
+                'closed': self._closed,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'wait_seconds': round(self._wait_seconds, 6),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            }
+
+class MySQL:
+    """Drop-in replacement for the Flask-MySQLdb extension backed by ConnectionPool.
+
+    `mysql.connection` checks a connection out of the pool on first use in an
+    app context and returns it to the pool when the context is torn down.
+    """
+
+    def __init__(self, app=None):
+        self.pool = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if 'mysql' in app.extensions:
+            return
+        app.extensions['mysql'] = self
+
+        config = app.config
+        connect_kwargs = {
+            'host': config.get('MYSQL_HOST', 'localhost'),
+            'user': config.get('MYSQL_USER', 'root'),
+            'passwd': config.get('MYSQL_PASSWORD', ''),
+            'port': config.get('MYSQL_PORT', 3306),
+            'connect_timeout': config.get('MYSQL_CONNECT_TIMEOUT', 10),
+        }
+        if config.get('MYSQL_DB'):
+            connect_kwargs['db'] = config['MYSQL_DB']
+        if config.get('MYSQL_READ_DEFAULT_FILE'):
+            connect_kwargs['read_default_file'] = config['MYSQL_READ_DEFAULT_FILE']
+        if config.get('MYSQL_CHARSET'):
+            connect_kwargs['charset'] = config['MYSQL_CHARSET']
+
+        self.pool = ConnectionPool(
+            connect_kwargs,
+            min_size=config.get('MYSQL_POOL_MIN_SIZE', 1),
+            max_size=config.get('MYSQL_POOL_MAX_SIZE', 10),
+            timeout=config.get('MYSQL_POOL_TIMEOUT', 10.0),
+            recycle=config.get('MYSQL_POOL_RECYCLE', 3600),
+            ping_interval=config.get('MYSQL_POOL_PING_INTERVAL', 30),
+        )
+        app.teardown_appcontext(self.teardown)
+
+    @property
+    def connection(self):
+        entry = g.get('_mysql_pool_entry')
+        if entry is None:
+            entry = self.pool.acquire()
+            g._mysql_pool_entry = entry
+        return entry[0]
+
+    def teardown(self, exception):
+        entry = g.pop('_mysql_pool_entry', None)
+        if entry is not None:
+            self.pool.release(entry, discard=isinstance(exception, MySQLdb.OperationalError))
 
 mysql = MySQL()
 
-def init_db(app):
-    mysql.init_app(app)
-    
-    try:
-        with app.app_context():
-            cursor = mysql.connection.cursor()
-            
-            # Create users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(100) NOT NULL,
-                    email VARCHAR(100) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL,
-                    role ENUM('manager', 'staff') DEFAULT 'staff',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create warehouses table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS warehouses (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(100) NOT NULL,
-                    location VARCHAR(255),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create product_categories table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS product_categories (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(100) NOT NULL,
-                    description TEXT
-                )
-            ''')
-            
-            # Create products table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS products (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    sku VARCHAR(100) UNIQUE NOT NULL,
-                    category_id INT,
-                    unit_of_measure VARCHAR(50),
-                    description TEXT,
-                    min_stock_level INT DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (category_id) REFERENCES product_categories(id)
-                )
-            ''')
-            
-            # Create stock table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS stock (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    product_id INT NOT NULL,
-                    warehouse_id INT NOT NULL,
-                    quantity INT DEFAULT 0,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    FOREIGN KEY (product_id) REFERENCES products(id),
-                    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id),
-                    UNIQUE KEY unique_product_warehouse (product_id, warehouse_id)
-                )
-            ''')
-            
-            # Create receipts table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS receipts (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    reference VARCHAR(100) UNIQUE NOT NULL,
-                    supplier VARCHAR(255),
-                    status ENUM('draft', 'waiting', 'ready', 'done', 'canceled') DEFAULT 'draft',
-                    created_by INT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    FOREIGN KEY (created_by) REFERENCES users(id)
-                )
-            ''')
-            
-            # Create receipt_items table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS receipt_items (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    receipt_id INT NOT NULL,
-                    product_id INT NOT NULL,
-                    quantity INT NOT NULL,
-                    warehouse_id INT NOT NULL,
-                    FOREIGN KEY (receipt_id) REFERENCES receipts(id),
-                    FOREIGN KEY (product_id) REFERENCES products(id),
-                    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
-                )
-            ''')
-            
-            # Create delivery_orders table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS delivery_orders (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    reference VARCHAR(100) UNIQUE NOT NULL,
-                    customer VARCHAR(255),
-                    status ENUM('draft', 'waiting', 'ready', 'done', 'canceled') DEFAULT 'draft',
-                    created_by INT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    FOREIGN KEY (created_by) REFERENCES users(id)
-                )
-            ''')
-            
-            # Create delivery_order_items table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS delivery_order_items (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    delivery_order_id INT NOT NULL,
-                    product_id INT NOT NULL,
-                    quantity INT NOT NULL,
-                    warehouse_id INT NOT NULL,
-                    FOREIGN KEY (delivery_order_id) REFERENCES delivery_orders(id),
-                    FOREIGN KEY (product_id) REFERENCES products(id),
-                    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
-                )
-            ''')
-            
-            # Create internal_transfers table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS internal_transfers (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    reference VARCHAR(100) UNIQUE NOT NULL,
-                    from_warehouse_id INT NOT NULL,
-                    to_warehouse_id INT NOT NULL,
-                    status ENUM('draft', 'waiting', 'ready', 'done', 'canceled') DEFAULT 'draft',
-                    created_by INT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    FOREIGN KEY (from_warehouse_id) REFERENCES warehouses(id),
-                    FOREIGN KEY (to_warehouse_id) REFERENCES warehouses(id),
-                    FOREIGN KEY (created_by) REFERENCES users(id)
-                )
-            ''')
-            
-            # Create internal_transfer_items table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS internal_transfer_items (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    transfer_id INT NOT NULL,
-                    product_id INT NOT NULL,
-                    quantity INT NOT NULL,
-                    FOREIGN KEY (transfer_id) REFERENCES internal_transfers(id),
-                    FOREIGN KEY (product_id) REFERENCES products(id)
-                )
-            ''')
-            
-            # Create stock_adjustments table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS stock_adjustments (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    reference VARCHAR(100) UNIQUE NOT NULL,
-                    reason TEXT,
-                    created_by INT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (created_by) REFERENCES users(id)
-                )
-            ''')
-            
-            # Create stock_adjustment_items table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS stock_adjustment_items (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    adjustment_id INT NOT NULL,
-                    product_id INT NOT NULL,
-                    warehouse_id INT NOT NULL,
-                    quantity_before INT NOT NULL,
-                    quantity_after INT NOT NULL,
-                    FOREIGN KEY (adjustment_id) REFERENCES stock_adjustments(id),
-                    FOREIGN KEY (product_id) REFERENCES products(id),
-                    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
-                )
-            ''')
-            
-            # Create stock_movements table (for history)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS stock_movements (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    product_id INT NOT NULL,
-                    warehouse_id INT NOT NULL,
-                    movement_type ENUM('receipt', 'delivery', 'transfer', 'adjustment'),
-                    reference_id INT,
-                    quantity_change INT NOT NULL,
-                    quantity_after INT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (product_id) REFERENCES products(id),
-                    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
-                )
-            ''')
-            
-            mysql.connection.commit()
-            cursor.close()
-            print("✅ Database tables created successfully!")
-            
-    except Exception as e:
-        print(f"❌ Database initialization error: {str(e)}")
-        raise e
\ No newline at end of file
+# InnoDB errors after which the whole transaction can safely be replayed
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+RETRYABLE_ERRORS = (ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK)
+
+def is_retryable_error(error):
+    return isinstance(error, MySQLdb.OperationalError) and bool(error.args) and error.args[0] in RETRYABLE_ERRORS
+
+def retry_on_deadlock(func):
+    """Replay a committing model method when InnoDB aborts it on a deadlock or lock wait timeout.
+
+    The wrapped method must roll back on failure. Attempts and backoff come from
+    MYSQL_DEADLOCK_RETRIES and MYSQL_DEADLOCK_BACKOFF; sleeps use full jitter.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except MySQLdb.OperationalError as e:
+                retries = current_app.config.get('MYSQL_DEADLOCK_RETRIES', 5)
+                if not is_retryable_error(e) or attempt >= retries:
+                    raise
+                attempt += 1
+                backoff = current_app.config.get('MYSQL_DEADLOCK_BACKOFF', 0.02)
+                delay = random.uniform(0, backoff * (2 ** attempt))
+                print(f"⚠️  {func.__name__}: lock conflict ({e.args[0]}), retry {attempt}/{retries} in {delay * 1000:.0f}ms")
+                time.sleep(delay)
+    return wrapper
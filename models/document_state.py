@@ -0,0 +1,195 @@
+from models.database import mysql, retry_on_deadlock
+from models.kpi import KPI
+from models.operations import Operations, StockDelta
+from models.reservation import StockReservation
+from models.metrics import metrics
+import time
+
+OPEN_STATUSES = ('draft', 'waiting', 'ready')
+
+# Document kind -> (header table, KPI counter prefix, query of its lines as
+# (document_id, product_id, source warehouse, target warehouse, quantity))
+DOCUMENTS = {
+    'receipt': ('receipts', 'receipts', '''
+        SELECT receipt_id, product_id, NULL, warehouse_id, quantity
+        FROM receipt_items
+        WHERE receipt_id IN ({ids})
+    '''),
+    'delivery': ('delivery_orders', 'deliveries', '''
+        SELECT delivery_order_id, product_id, warehouse_id, NULL, quantity
+        FROM delivery_order_items
+        WHERE delivery_order_id IN ({ids})
+    '''),
+    'transfer': ('internal_transfers', 'transfers', '''
+        SELECT i.transfer_id, i.product_id, t.from_warehouse_id, t.to_warehouse_id, i.quantity
+        FROM internal_transfer_items i
+        JOIN internal_transfers t ON t.id = i.transfer_id
+        WHERE i.transfer_id IN ({ids})
+    '''),
+}
+
+# Action -> statuses it may start from. Documents that take no stock out
+# (receipts) need no reservation and may be validated from any open status.
+TRANSITIONS = {
+    'confirm': ('draft', 'waiting'),
+    'validate': ('ready',),
+    'cancel': OPEN_STATUSES,
+}
+
+class DocumentStates:
+    """Status changes of receipts, delivery orders and internal transfers.
+
+    draft/waiting --confirm--> ready (or waiting while stock is short)
+    ready --validate--> done, open --cancel--> canceled
+
+    Confirming reserves the outgoing lines, validating turns the lines into
+    stock movements and releases their reservations (refusing documents
+    whose lines are no longer on hand), canceling a ready document releases
+    them. A call handles any number of documents of one kind in one
+    transaction: headers are locked in id order, all lines are read with one
+    query, the stock effects of every accepted document go through one
+    reservation statement or one apply_stock_deltas call, and statuses are
+    written with one UPDATE per target status. Documents that cannot make
+    the transition are reported and left unchanged.
+    """
+    MAX_BATCH = 1000
+
+    @staticmethod
+    def allowed(action, status, outgoing):
+        if action == 'validate' and not outgoing:
+            return status in OPEN_STATUSES
+        return status in TRANSITIONS[action]
+
+    @staticmethod
+    def check_on_hand(cursor, kind, accepted, outgoing, statuses, results):
+        """Keep the documents whose outgoing lines are still on hand.
+
+        Adjustments and cycle counts may set a line below its reserved
+        quantity, so a reservation alone does not guarantee the stock is
+        there. Lines are locked in key order and consumed in request order;
+        the other documents are reported with their shortages and left
+        unchanged. Returns the kept document ids.
+        """
+        lines = StockReservation.lookup(
+            cursor, {key for document_id in accepted for key in outgoing.get(document_id, {})}, lock=True)
+        remaining = {key: line['on_hand'] for key, line in lines.items()}
+        kept = []
+        for document_id in accepted:
+            totals = outgoing.get(document_id, {})
+            shortages = [
+                {'product_id': product_id, 'warehouse_id': warehouse_id,
+                 'requested': quantity, 'on_hand': remaining[(product_id, warehouse_id)]}
+                for (product_id, warehouse_id), quantity in sorted(totals.items())
+                if remaining[(product_id, warehouse_id)] < quantity
+            ]
+            if shortages:
+                results[document_id] = {'id': document_id, 'ok': False, 'status': statuses[document_id],
+                                        'error': f"not enough stock on hand to validate {kind} {document_id}",
+                                        'shortages': shortages}
+                continue
+            for key, quantity in totals.items():
+                remaining[key] -= quantity
+            kept.append(document_id)
+        return kept
+
+    @staticmethod
+    @retry_on_deadlock
+    def transition(kind, action, document_ids):
+        """Apply `action` to documents of `kind`. Returns one result per distinct id, in request order."""
+        if kind not in DOCUMENTS:
+            raise ValueError(f"Unknown document kind: {kind}")
+        if action not in TRANSITIONS:
+            raise ValueError(f"Unknown action: {action}")
+        ids = list(dict.fromkeys(int(document_id) for document_id in document_ids))
+        if not ids:
+            return []
+        if len(ids) > DocumentStates.MAX_BATCH:
+            raise ValueError(f"At most {DocumentStates.MAX_BATCH} documents per call")
+        table, counter, lines_query = DOCUMENTS[kind]
+
+        started = time.perf_counter()
+        placeholders = ', '.join(['%s'] * len(ids))
+        results, new_statuses, movement_count = {}, {}, 0
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute(f'SELECT id, status FROM {table} WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE', ids)
+            statuses = dict(cursor.fetchall())
+            cursor.execute(lines_query.format(ids=placeholders), ids)
+            lines = {}
+            for document_id, product_id, source, target, quantity in cursor.fetchall():
+                lines.setdefault(document_id, []).append((product_id, source, target, quantity))
+
+            # Outgoing quantity per (product_id, warehouse_id) of every document
+            outgoing = {}
+            for document_id, document_lines in lines.items():
+                totals = outgoing.setdefault(document_id, {})
+                for product_id, source, target, quantity in document_lines:
+                    if source is not None:
+                        totals[(product_id, source)] = totals.get((product_id, source), 0) + quantity
+
+            accepted = []
+            for document_id in ids:
+                status = statuses.get(document_id)
+                if status is None:
+                    results[document_id] = {'id': document_id, 'ok': False, 'status': None,
+                                            'error': f"{kind} {document_id} not found"}
+                elif not DocumentStates.allowed(action, status, outgoing.get(document_id)):
+                    results[document_id] = {'id': document_id, 'ok': False, 'status': status,
+                                            'error': f"cannot {action} a {status} {kind}"}
+                else:
+                    accepted.append(document_id)
+
+            if action == 'confirm':
+                shortages = StockReservation.allocate(
+                    cursor, [(document_id, outgoing.get(document_id, {})) for document_id in accepted])
+                for document_id in accepted:
+                    new_statuses[document_id] = 'waiting' if shortages[document_id] else 'ready'
+                    results[document_id] = {'id': document_id, 'ok': True, 'status': new_statuses[document_id],
+                                            'shortages': shortages[document_id]}
+            else:
+                if action == 'validate':
+                    accepted = DocumentStates.check_on_hand(cursor, kind, accepted, outgoing, statuses, results)
+                released = {}
+                for document_id in accepted:
+                    if statuses[document_id] == 'ready':
+                        for key, quantity in outgoing.get(document_id, {}).items():
+                            released[key] = released.get(key, 0) + quantity
+                if action == 'validate':
+                    deltas = []
+                    for document_id in accepted:
+                        for product_id, source, target, quantity in lines.get(document_id, []):
+                            if source is not None:
+                                deltas.append(StockDelta(product_id, source, -quantity, kind, document_id))
+                            if target is not None:
+                                deltas.append(StockDelta(product_id, target, quantity, kind, document_id))
+                    Operations.apply_stock_deltas(deltas)
+                    movement_count = sum(1 for delta in deltas if delta.quantity_change != 0)
+                StockReservation.release(cursor, released)
+                for document_id in accepted:
+                    new_statuses[document_id] = 'done' if action == 'validate' else 'canceled'
+                    results[document_id] = {'id': document_id, 'ok': True, 'status': new_statuses[document_id]}
+
+            # One UPDATE per target status, then the KPI status counters
+            by_status, kpi_changes = {}, {}
+            for document_id, status in new_statuses.items():
+                if status != statuses[document_id]:
+                    by_status.setdefault(status, []).append(document_id)
+                    kpi_changes[f'{counter}.{statuses[document_id]}'] = kpi_changes.get(f'{counter}.{statuses[document_id]}', 0) - 1
+                    kpi_changes[f'{counter}.{status}'] = kpi_changes.get(f'{counter}.{status}', 0) + 1
+            for status, status_ids in sorted(by_status.items()):
+                cursor.execute(f'UPDATE {table} SET status = %s WHERE id IN ({", ".join(["%s"] * len(status_ids))})',
+                               [status] + status_ids)
+            KPI.bump(cursor, kpi_changes)
+
+            mysql.connection.commit()
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+        operation = f'{action}_{kind}'
+        metrics.operations.observe(time.perf_counter() - started, operation)
+        metrics.operation_lines.observe(len(ids), operation)
+        metrics.movements.inc(movement_count)
+        return [results[document_id] for document_id in ids]
@@ -0,0 +1,83 @@
+from models.database import mysql
+import threading
+import time
+
+class DatabaseHealth:
+    """Shared up/down state of the MySQL connection.
+
+    The database is probed with SELECT 1 at most once per DB_HEALTH_TTL seconds
+    per process; every caller in between gets the cached state. The state only
+    flips after DB_HEALTH_FAILURE_THRESHOLD consecutive failed probes (or
+    DB_HEALTH_RECOVERY_THRESHOLD consecutive good ones), so a single blip does
+    not toggle demo mode back and forth.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 5.0
+        self.failure_threshold = 2
+        self.recovery_threshold = 2
+        self._lock = threading.Lock()
+        self._up = None
+        self._checked_at = 0.0
+        self._changed_at = None
+        self._failures = 0
+        self._successes = 0
+        self.last_error = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('DB_HEALTH_TTL', self.ttl)
+        self.failure_threshold = app.config.get('DB_HEALTH_FAILURE_THRESHOLD', self.failure_threshold)
+        self.recovery_threshold = app.config.get('DB_HEALTH_RECOVERY_THRESHOLD', self.recovery_threshold)
+
+    def is_up(self):
+        if self._up is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._up
+        # Only one request probes; the others keep using the current state
+        if self._lock.acquire(blocking=self._up is None):
+            try:
+                if self._up is None or time.monotonic() - self._checked_at >= self.ttl:
+                    self.record(self._probe())
+            finally:
+                self._lock.release()
+        return bool(self._up)
+
+    def _probe(self):
+        try:
+            cursor = mysql.connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+    def record(self, ok):
+        self._checked_at = time.monotonic()
+        if ok:
+            self._successes += 1
+            self._failures = 0
+            flip = self._up is not True and (self._up is None or self._successes >= self.recovery_threshold)
+        else:
+            self._failures += 1
+            self._successes = 0
+            flip = self._up is not False and (self._up is None or self._failures >= self.failure_threshold)
+        if flip:
+            self._up = ok
+            self._changed_at = time.time()
+            if ok:
+                print("✅ Database connection: SUCCESS")
+            else:
+                print(f"❌ Database connection: FAILED - {self.last_error}")
+
+    def status(self):
+        return {
+            'database': 'connected' if self._up else 'disconnected',
+            'checked_seconds_ago': round(time.monotonic() - self._checked_at, 1) if self._checked_at else None,
+            'state_since': self._changed_at,
+            'consecutive_failures': self._failures,
+            'last_error': self.last_error if not self._up else None,
+        }
+
+db_health = DatabaseHealth()
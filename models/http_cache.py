@@ -0,0 +1,108 @@
+from models.database import mysql
+from flask import Response, json, request
+import gzip
+import threading
+
+# Lists served with version ETags; each name has a row in collection_versions
+COLLECTIONS = ('products', 'categories', 'warehouses')
+
+class CollectionVersion:
+    """Version counters bumped by every write to a cached collection.
+
+    Writers call bump() inside their own transaction, after their row writes
+    and before KPI.bump, so the new version becomes visible exactly when the
+    change does.
+    """
+
+    @staticmethod
+    def bump(cursor, name):
+        cursor.execute('''
+            INSERT INTO collection_versions (name, version)
+            VALUES (%s, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+        ''', (name,))
+
+    @staticmethod
+    def get(name):
+        cursor = mysql.connection.cursor()
+        cursor.execute('SELECT version FROM collection_versions WHERE name = %s', (name,))
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] if row else 0
+
+class CollectionCache:
+    """Per-process JSON (and gzip) bodies of collection lists, keyed by version.
+
+    A request costs one primary-key read of the version: a matching
+    If-None-Match gets a 304, otherwise the body is served from memory unless
+    the version moved, in which case the list is loaded once and cached.
+    """
+
+    def __init__(self):
+        self._entries = {}  # name -> (version, json bytes, gzip bytes or None)
+        self._lock = threading.Lock()
+        self.compress_level = 6
+
+    def response(self, name, loader):
+        # Read the version before the data: a concurrent write can only make
+        # the cached body newer than its ETag, never older
+        version = CollectionVersion.get(name)
+        etag = f'{name}-{version}'
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != version:
+            entry = (version, json.dumps(loader()).encode('utf-8'), None)
+            with self._lock:
+                self._entries[name] = entry
+
+        response = Response(entry[1], mimetype='application/json')
+        if 'gzip' in request.accept_encodings and len(entry[1]) >= Compression.MIN_SIZE:
+            if entry[2] is None:
+                entry = (entry[0], entry[1], gzip.compress(entry[1], self.compress_level))
+                with self._lock:
+                    self._entries[name] = entry
+            response.set_data(entry[2])
+            response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+collection_cache = CollectionCache()
+
+class Compression:
+    """gzip for HTML, JSON, CSS and JavaScript responses of at least MIN_SIZE bytes."""
+    MIN_SIZE = 1024
+    MIMETYPES = ('text/html', 'application/json', 'text/css', 'application/javascript', 'text/plain')
+
+    def __init__(self):
+        self.level = 6
+
+    def init_app(self, app):
+        Compression.MIN_SIZE = app.config.get('GZIP_MIN_SIZE', Compression.MIN_SIZE)
+        self.level = collection_cache.compress_level = app.config.get('GZIP_LEVEL', self.level)
+        app.after_request(self.compress)
+
+    def compress(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in Compression.MIMETYPES
+                or 'gzip' not in request.accept_encodings):
+            return response
+        data = response.get_data()
+        if len(data) < Compression.MIN_SIZE:
+            return response
+        response.set_data(gzip.compress(data, self.level))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        # A strong ETag must change with the encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag + '-gzip')
+        return response
+
+compression = Compression()
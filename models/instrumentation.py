@@ -0,0 +1,162 @@
+from flask import current_app, g, has_app_context, request
+import json
+import logging
+import re
+import time
+
+logger = logging.getLogger('stockmaster.sql')
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r'\b\d+\b')
+_PLACEHOLDER_GROUP = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_REPEATED_GROUPS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+
+def normalize(sql):
+    """Statement shape: literals and placeholders become ?, IN/VALUES lists collapse."""
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _STRING.sub('?', sql.replace('%s', '?'))
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_GROUP.sub('(?)', sql)
+    return _REPEATED_GROUPS.sub('(?), ...', sql)
+
+class QueryStats:
+    """Statements run while serving one request."""
+    SLOWEST = 5
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}  # shape -> [executions, total seconds, slowest execution]
+
+    def add(self, shape, seconds):
+        self.count += 1
+        self.seconds += seconds
+        totals = self.shapes.get(shape)
+        if totals is None:
+            self.shapes[shape] = [1, seconds, seconds]
+        else:
+            totals[0] += 1
+            totals[1] += seconds
+            if seconds > totals[2]:
+                totals[2] = seconds
+
+    def slowest(self):
+        """Statement shapes by their slowest execution, slowest first."""
+        return sorted(((slowest, shape) for shape, (_, _, slowest) in self.shapes.items()),
+                      reverse=True)[:QueryStats.SLOWEST]
+
+    def repeated(self, threshold):
+        """Shapes run at least `threshold` times: likely a query issued once per row (N+1)."""
+        return sorted(((executions, shape) for shape, (executions, _, _) in self.shapes.items()
+                       if executions >= threshold), reverse=True)
+
+class SQLInstrumentation:
+    """Times every statement sent through pooled connections.
+
+    Each request gets a QueryStats on `g`; when it ends a one-line JSON
+    summary is logged to the `stockmaster.sql` logger (query count, DB time,
+    slowest statements, repeated shapes) and, in debug mode or with
+    SQL_DEBUG_HEADERS, copied into X-DB-* response headers. Statements slower
+    than SLOW_QUERY_MS are logged on their own as they happen, inside or
+    outside a request.
+    """
+    slow_seconds = 0.2
+    repeat_threshold = 5
+    debug_headers = False
+
+    def init_app(self, app):
+        self.slow_seconds = app.config.get('SLOW_QUERY_MS', 200) / 1000.0
+        self.repeat_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+        self.debug_headers = app.config.get('SQL_DEBUG_HEADERS', False)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(app.config.get('SQL_LOG_LEVEL', 'INFO'))
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+    def start_request(self):
+        g._query_stats = QueryStats()
+
+    def finish_request(self, response):
+        stats = g.pop('_query_stats', None)
+        if stats is None or not stats.count:
+            return response
+        repeated = stats.repeated(self.repeat_threshold)
+        slowest = stats.slowest()
+        logger.info(json.dumps({
+            'event': 'request_sql',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(stats.seconds * 1000, 2),
+            'slowest': [{'ms': round(seconds * 1000, 2), 'sql': shape} for seconds, shape in slowest],
+            'repeated': [{'count': executions, 'sql': shape} for executions, shape in repeated],
+        }))
+        if repeated:
+            logger.warning(json.dumps({'event': 'n_plus_one', 'path': request.path,
+                                       'count': repeated[0][0], 'sql': repeated[0][1]}))
+        if self.debug_headers or current_app.debug:
+            response.headers['X-DB-Queries'] = str(stats.count)
+            response.headers['X-DB-Time-ms'] = f'{stats.seconds * 1000:.2f}'
+            response.headers['X-DB-Slowest'] = f'{slowest[0][0] * 1000:.2f}ms {slowest[0][1][:200]}'
+            if repeated:
+                response.headers['X-DB-Repeated'] = f'{repeated[0][0]}x {repeated[0][1][:200]}'
+        return response
+
+    def record(self, sql, seconds):
+        if isinstance(sql, bytes):
+            sql = sql.decode('utf-8', 'replace')
+        shape = normalize(sql)
+        if has_app_context():
+            stats = g.get('_query_stats')
+            if stats is not None:
+                stats.add(shape, seconds)
+        if seconds >= self.slow_seconds:
+            logger.warning(json.dumps({'event': 'slow_query', 'ms': round(seconds * 1000, 2), 'sql': shape}))
+
+sql_instrumentation = SQLInstrumentation()
+
+class InstrumentedCursor:
+    """Cursor proxy timing execute() and executemany()."""
+    __slots__ = ('_cursor',)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            sql_instrumentation.record(query, time.perf_counter() - started)
+
+    def executemany(self, query, args):
+        # MySQLdb sends a multi-row INSERT as one statement: counted once
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            sql_instrumentation.record(query, time.perf_counter() - started)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are instrumented."""
+    __slots__ = ('_conn',)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args):
+        return InstrumentedCursor(self._conn.cursor(*args))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
@@ -0,0 +1,144 @@
+from models.database import mysql
+from models.alert import LowStockAlert
+from models.stock_summary import StockSummary
+from models.archive import ARCHIVE_SUFFIX
+import random
+import threading
+import time
+
+# Document tables whose per-status counts are tracked, keyed by counter prefix
+DOCUMENT_TABLES = {
+    'receipts': 'receipts',
+    'deliveries': 'delivery_orders',
+    'transfers': 'internal_transfers',
+}
+DOCUMENT_STATUSES = ('draft', 'waiting', 'ready', 'done', 'canceled')
+PENDING_STATUSES = ('draft', 'waiting', 'ready')
+
+class KPI:
+    """Dashboard counters maintained incrementally by the write paths.
+
+    Each counter is spread over KPI_SLOTS rows of kpi_counters and a writer
+    bumps one random slot, so concurrent documents rarely queue on the same
+    row lock. Reading all counters is one scan of a table of a few dozen rows.
+    Every KPI_RECOUNT_INTERVAL seconds one reader rewrites them from the source
+    tables to correct drift; the time of the last recount is itself a counter
+    so all worker processes share it.
+    """
+    SLOTS = 8
+    RECOUNT_INTERVAL = 3600
+    _recount_lock = threading.Lock()
+
+    @staticmethod
+    def init_app(app):
+        KPI.SLOTS = app.config.get('KPI_SLOTS', KPI.SLOTS)
+        KPI.RECOUNT_INTERVAL = app.config.get('KPI_RECOUNT_INTERVAL', KPI.RECOUNT_INTERVAL)
+
+    @staticmethod
+    def bump(cursor, changes):
+        """Add deltas to counters inside the caller's transaction.
+
+        Call it after the stock rows of the transaction have been written so
+        counter locks are always taken last.
+        """
+        rows = [(name, random.randrange(KPI.SLOTS), delta) for name, delta in sorted(changes.items()) if delta]
+        if rows:
+            cursor.executemany('''
+                INSERT INTO kpi_counters (name, slot, value)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+            ''', rows)
+
+    @staticmethod
+    def _read():
+        cursor = mysql.connection.cursor()
+        cursor.execute('SELECT name, SUM(value) FROM kpi_counters GROUP BY name')
+        counters = {name: int(value) for name, value in cursor.fetchall()}
+        cursor.close()
+        return counters
+
+    @staticmethod
+    def get_all():
+        counters = KPI._read()
+        if time.time() - counters.get('_recounted_at', 0) >= KPI.RECOUNT_INTERVAL and KPI.try_recount():
+            counters = KPI._read()
+        return counters
+
+    @staticmethod
+    def summary():
+        counters = KPI.get_all()
+        summary = {
+            'total_products': counters.get('total_products', 0),
+            'low_stock': counters.get('low_stock', 0),
+        }
+        for prefix in DOCUMENT_TABLES:
+            summary[f'pending_{prefix}'] = sum(counters.get(f'{prefix}.{status}', 0) for status in PENDING_STATUSES)
+            summary[prefix] = {status: counters.get(f'{prefix}.{status}', 0) for status in DOCUMENT_STATUSES}
+        return summary
+
+    @staticmethod
+    def try_recount():
+        if not KPI._recount_lock.acquire(blocking=False):
+            return False
+        try:
+            return KPI.recount()
+        except Exception as e:
+            print(f"⚠️  KPI recount failed: {str(e)}")
+            return False
+        finally:
+            KPI._recount_lock.release()
+
+    @staticmethod
+    def recount():
+        """Rebuild every counter from the source tables.
+
+        Only the worker process holding the kpi_recount lock runs it; the
+        others return False at once, without touching any table. It first
+        rebuilds the low-stock alert set and the product stock summary (each
+        committed on its own), then locks the counter rows, so writers that
+        commit while the counts run wait for the rewrite and then apply their
+        own delta on top. Must not be called with uncommitted writes on the
+        connection.
+        """
+        cursor = mysql.connection.cursor()
+        try:
+            # Only one worker process recounts at a time
+            cursor.execute("SELECT GET_LOCK('kpi_recount', 0)")
+            if not cursor.fetchone()[0]:
+                return False
+            try:
+                # Low stock is counted from the alert set, so rebuild that first,
+                # then the per-product summary maintained from the same increments
+                LowStockAlert.rebuild()
+                StockSummary.rebuild()
+
+                cursor.execute('SELECT name FROM kpi_counters FOR UPDATE')
+
+                counters = {}
+                cursor.execute('SELECT COUNT(*) FROM products')
+                counters['total_products'] = cursor.fetchone()[0]
+                cursor.execute('SELECT COUNT(*) FROM low_stock_alerts')
+                counters['low_stock'] = cursor.fetchone()[0]
+                for prefix, table in DOCUMENT_TABLES.items():
+                    for status in DOCUMENT_STATUSES:
+                        counters[f'{prefix}.{status}'] = 0
+                    # Closed documents may have been moved to the archive tier
+                    for source in (table, table + ARCHIVE_SUFFIX):
+                        cursor.execute(f'SELECT status, COUNT(*) FROM {source} GROUP BY status')
+                        for status, count in cursor.fetchall():
+                            counters[f'{prefix}.{status}'] += count
+
+                counters['_recounted_at'] = int(time.time())
+                cursor.execute('DELETE FROM kpi_counters')
+                cursor.executemany('INSERT INTO kpi_counters (name, slot, value) VALUES (%s, 0, %s)',
+                                   sorted(counters.items()))
+                mysql.connection.commit()
+                return True
+            except Exception:
+                mysql.connection.rollback()
+                raise
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK('kpi_recount')")
+                cursor.fetchone()
+        finally:
+            cursor.close()
@@ -0,0 +1,203 @@
+from flask import Response, g, request
+from functools import wraps
+import bisect
+import os
+import threading
+import time
+
+# Latency buckets in seconds, and line-count buckets for documents
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LINE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class _Metric:
+    """Base for metrics recorded per thread and summed when scraped.
+
+    Each thread writes only to its own shard, so recording takes no lock and
+    threads never contend; the shared lock is taken once per thread (to
+    register its shard) and on every scrape.
+    """
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _snapshots(self):
+        with self._lock:
+            shards = list(self._shards)
+        # Copying a dict is atomic under the GIL, even while its thread writes to it
+        return [dict(shard) for shard in shards]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, *labels):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def render(self):
+        totals = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return [f'{self.name}{_labels(self.labelnames, labels)} {value}' for labels, value in sorted(totals.items())]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # One count per bucket (non-cumulative), then sum and count
+            series = shard[labels] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        totals = {}
+        for shard in self._snapshots():
+            for labels, series in shard.items():
+                total = totals.setdefault(labels, [0] * len(series))
+                for i, value in enumerate(list(series)):
+                    total[i] += value
+        lines = []
+        for labels, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            le = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {series[-1]}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}')
+        return lines
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns {label tuple: value}."""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labelnames, callback, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self):
+        return [f'{self.name}{_labels(self.labelnames, labels)} {value}'
+                for labels, value in sorted(self.callback().items()) if value is not None]
+
+class Metrics:
+    """Prometheus text exposition of the process's metrics at /metrics.
+
+    Every worker process keeps its own numbers; each Prometheus scrape sees the
+    worker that served it, identified by the `pid` in process_start_time.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self.token = None
+        self.started = time.time()
+        self.requests = self.histogram('stockmaster_http_request_duration_seconds',
+                                       'Request latency by endpoint', ('endpoint', 'method', 'status'))
+        self.operations = self.histogram('stockmaster_operation_duration_seconds',
+                                         'Duration of Operations calls', ('operation',))
+        self.operation_lines = self.histogram('stockmaster_operation_lines',
+                                              'Lines per Operations call (documents per queue_batch)', ('operation',), buckets=LINE_BUCKETS)
+        self.documents = self.counter('stockmaster_documents_written_total',
+                                      'Documents committed', ('kind',))
+        self.movements = self.counter('stockmaster_movements_written_total', 'Stock movements committed')
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, labelnames, callback, kind='gauge'):
+        metric = Gauge(name, help, labelnames, callback, kind)
+        self._metrics.append(metric)
+        return metric
+
+    def timed(self, operation):
+        """Decorator observing the duration of every call under `operation`."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.operations.observe(time.perf_counter() - started, operation)
+            return wrapper
+        return decorator
+
+    def init_app(self, app):
+        self.token = app.config.get('METRICS_TOKEN') or None
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            self.requests.observe(time.perf_counter() - started, request.endpoint or 'unmatched',
+                                  request.method, response.status_code)
+        return response
+
+    def view(self):
+        if self.token and request.headers.get('Authorization') != f'Bearer {self.token}':
+            return Response('Unauthorized\n', status=401)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    def render(self):
+        lines = [
+            '# HELP stockmaster_process_start_time_seconds Start time of this worker process',
+            '# TYPE stockmaster_process_start_time_seconds gauge',
+            f'stockmaster_process_start_time_seconds{{pid="{os.getpid()}"}} {self.started}',
+        ]
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
@@ -0,0 +1,565 @@
+from models.database import mysql
+import MySQLdb
+import argparse
+import time
+
+# Versioned schema migrations. DDL only runs through migrate() (python -m
+# models.migrations, or AUTO_MIGRATE=true in development); app startup just
+# reads the stored version. Every step is idempotent, so a database created
+# by the old import-time init_db, or a run interrupted midway, upgrades cleanly.
+
+def create_index(table, name, definition, kind=''):
+    """Migration step that creates an index unless it already exists."""
+    def step(cursor):
+        cursor.execute('''
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+            LIMIT 1
+        ''', (table, name))
+        if not cursor.fetchone():
+            cursor.execute(f'CREATE {kind} INDEX {name} ON {table} {definition}')
+    return step
+
+def add_column(table, name, definition):
+    """Migration step that adds a column unless it already exists."""
+    def step(cursor):
+        cursor.execute('''
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+            LIMIT 1
+        ''', (table, name))
+        if not cursor.fetchone():
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+    return step
+
+MIGRATIONS = [
+    (1, 'Base tables', [
+        # Create users table
+        '''
+            CREATE TABLE IF NOT EXISTS users (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(100) NOT NULL,
+                email VARCHAR(100) UNIQUE NOT NULL,
+                password VARCHAR(255) NOT NULL,
+                role ENUM('manager', 'staff') DEFAULT 'staff',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        # Create warehouses table
+        '''
+            CREATE TABLE IF NOT EXISTS warehouses (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(100) NOT NULL,
+                location VARCHAR(255),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        # Create product_categories table
+        '''
+            CREATE TABLE IF NOT EXISTS product_categories (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(100) NOT NULL,
+                description TEXT
+            )
+        ''',
+        # Create products table
+        '''
+            CREATE TABLE IF NOT EXISTS products (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                sku VARCHAR(100) UNIQUE NOT NULL,
+                category_id INT,
+                unit_of_measure VARCHAR(50),
+                description TEXT,
+                min_stock_level INT DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (category_id) REFERENCES product_categories(id)
+            )
+        ''',
+        # Create stock table
+        '''
+            CREATE TABLE IF NOT EXISTS stock (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                product_id INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                quantity INT DEFAULT 0,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                FOREIGN KEY (product_id) REFERENCES products(id),
+                FOREIGN KEY (warehouse_id) REFERENCES warehouses(id),
+                UNIQUE KEY unique_product_warehouse (product_id, warehouse_id)
+            )
+        ''',
+        # Create receipts table
+        '''
+            CREATE TABLE IF NOT EXISTS receipts (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                reference VARCHAR(100) UNIQUE NOT NULL,
+                supplier VARCHAR(255),
+                status ENUM('draft', 'waiting', 'ready', 'done', 'canceled') DEFAULT 'draft',
+                created_by INT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                FOREIGN KEY (created_by) REFERENCES users(id)
+            )
+        ''',
+        # Create receipt_items table
+        '''
+            CREATE TABLE IF NOT EXISTS receipt_items (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                receipt_id INT NOT NULL,
+                product_id INT NOT NULL,
+                quantity INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                FOREIGN KEY (receipt_id) REFERENCES receipts(id),
+                FOREIGN KEY (product_id) REFERENCES products(id),
+                FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
+            )
+        ''',
+        # Create delivery_orders table
+        '''
+            CREATE TABLE IF NOT EXISTS delivery_orders (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                reference VARCHAR(100) UNIQUE NOT NULL,
+                customer VARCHAR(255),
+                status ENUM('draft', 'waiting', 'ready', 'done', 'canceled') DEFAULT 'draft',
+                created_by INT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                FOREIGN KEY (created_by) REFERENCES users(id)
+            )
+        ''',
+        # Create delivery_order_items table
+        '''
+            CREATE TABLE IF NOT EXISTS delivery_order_items (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                delivery_order_id INT NOT NULL,
+                product_id INT NOT NULL,
+                quantity INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                FOREIGN KEY (delivery_order_id) REFERENCES delivery_orders(id),
+                FOREIGN KEY (product_id) REFERENCES products(id),
+                FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
+            )
+        ''',
+        # Create internal_transfers table
+        '''
+            CREATE TABLE IF NOT EXISTS internal_transfers (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                reference VARCHAR(100) UNIQUE NOT NULL,
+                from_warehouse_id INT NOT NULL,
+                to_warehouse_id INT NOT NULL,
+                status ENUM('draft', 'waiting', 'ready', 'done', 'canceled') DEFAULT 'draft',
+                created_by INT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                FOREIGN KEY (from_warehouse_id) REFERENCES warehouses(id),
+                FOREIGN KEY (to_warehouse_id) REFERENCES warehouses(id),
+                FOREIGN KEY (created_by) REFERENCES users(id)
+            )
+        ''',
+        # Create internal_transfer_items table
+        '''
+            CREATE TABLE IF NOT EXISTS internal_transfer_items (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                transfer_id INT NOT NULL,
+                product_id INT NOT NULL,
+                quantity INT NOT NULL,
+                FOREIGN KEY (transfer_id) REFERENCES internal_transfers(id),
+                FOREIGN KEY (product_id) REFERENCES products(id)
+            )
+        ''',
+        # Create stock_adjustments table
+        '''
+            CREATE TABLE IF NOT EXISTS stock_adjustments (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                reference VARCHAR(100) UNIQUE NOT NULL,
+                reason TEXT,
+                created_by INT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (created_by) REFERENCES users(id)
+            )
+        ''',
+        # Create stock_adjustment_items table
+        '''
+            CREATE TABLE IF NOT EXISTS stock_adjustment_items (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                adjustment_id INT NOT NULL,
+                product_id INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                quantity_before INT NOT NULL,
+                quantity_after INT NOT NULL,
+                FOREIGN KEY (adjustment_id) REFERENCES stock_adjustments(id),
+                FOREIGN KEY (product_id) REFERENCES products(id),
+                FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
+            )
+        ''',
+        # Create stock_movements table (for history)
+        '''
+            CREATE TABLE IF NOT EXISTS stock_movements (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                product_id INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                movement_type ENUM('receipt', 'delivery', 'transfer', 'adjustment'),
+                reference_id INT,
+                quantity_change INT NOT NULL,
+                quantity_after INT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (product_id) REFERENCES products(id),
+                FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
+            )
+        ''',
+    ]),
+    (2, 'Move history filter indexes', [
+        create_index('stock_movements', 'idx_movements_created', '(created_at, id)'),
+        create_index('stock_movements', 'idx_movements_type_created', '(movement_type, created_at, id)'),
+        create_index('stock_movements', 'idx_movements_warehouse_created', '(warehouse_id, created_at, id)'),
+    ]),
+    (3, 'Dashboard KPI counters', [
+        # Create kpi_counters table (dashboard counters, see models/kpi.py)
+        '''
+            CREATE TABLE IF NOT EXISTS kpi_counters (
+                name VARCHAR(64) NOT NULL,
+                slot TINYINT UNSIGNED NOT NULL DEFAULT 0,
+                value BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (name, slot)
+            )
+        ''',
+        create_index('receipts', 'idx_receipts_status', '(status)'),
+        create_index('delivery_orders', 'idx_delivery_orders_status', '(status)'),
+        create_index('internal_transfers', 'idx_internal_transfers_status', '(status)'),
+    ]),
+    (4, 'Low-stock alerts', [
+        # Create low_stock_alerts table (stock lines below min_stock_level)
+        '''
+            CREATE TABLE IF NOT EXISTS low_stock_alerts (
+                product_id INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                quantity INT NOT NULL,
+                min_stock_level INT NOT NULL,
+                flagged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (product_id, warehouse_id),
+                INDEX idx_low_stock_alerts_flagged (flagged_at),
+                FOREIGN KEY (product_id) REFERENCES products(id),
+                FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
+            )
+        ''',
+    ]),
+    (5, 'Product search indexes', [
+        create_index('products', 'idx_products_name', '(name)'),
+        create_index('products', 'ft_products_name_description', '(name, description) WITH PARSER ngram', kind='FULLTEXT'),
+    ]),
+    (6, 'Document reference sequences', [
+        # Create document_sequences table (last number handed out per reference prefix)
+        '''
+            CREATE TABLE IF NOT EXISTS document_sequences (
+                name VARCHAR(20) PRIMARY KEY,
+                last_value BIGINT UNSIGNED NOT NULL
+            )
+        ''',
+    ]),
+    (7, 'Stock snapshots', [
+        # Create stock_snapshots table (one row per point-in-time snapshot)
+        '''
+            CREATE TABLE IF NOT EXISTS stock_snapshots (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                taken_at DATETIME NOT NULL,
+                base_snapshot_id INT NULL,
+                line_count INT NOT NULL DEFAULT 0,
+                movement_count INT NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE KEY uq_stock_snapshots_taken (taken_at)
+            )
+        ''',
+        # Create stock_snapshot_lines table (non-zero quantity per stock line)
+        '''
+            CREATE TABLE IF NOT EXISTS stock_snapshot_lines (
+                snapshot_id INT NOT NULL,
+                product_id INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                quantity INT NOT NULL,
+                PRIMARY KEY (snapshot_id, product_id, warehouse_id),
+                INDEX idx_snapshot_lines_warehouse (snapshot_id, warehouse_id),
+                FOREIGN KEY (snapshot_id) REFERENCES stock_snapshots(id) ON DELETE CASCADE
+            )
+        ''',
+    ]),
+    (8, 'Archive tier', [
+        # Archive tables mirror the hot tables (see models/archive.py)
+        'CREATE TABLE IF NOT EXISTS stock_movements_archive LIKE stock_movements',
+        'CREATE TABLE IF NOT EXISTS receipts_archive LIKE receipts',
+        'CREATE TABLE IF NOT EXISTS receipt_items_archive LIKE receipt_items',
+        'CREATE TABLE IF NOT EXISTS delivery_orders_archive LIKE delivery_orders',
+        'CREATE TABLE IF NOT EXISTS delivery_order_items_archive LIKE delivery_order_items',
+        'CREATE TABLE IF NOT EXISTS internal_transfers_archive LIKE internal_transfers',
+        'CREATE TABLE IF NOT EXISTS internal_transfer_items_archive LIKE internal_transfer_items',
+        'CREATE TABLE IF NOT EXISTS stock_adjustments_archive LIKE stock_adjustments',
+        'CREATE TABLE IF NOT EXISTS stock_adjustment_items_archive LIKE stock_adjustment_items',
+        # Create stock_movement_daily table (archived movements rolled up per day)
+        '''
+            CREATE TABLE IF NOT EXISTS stock_movement_daily (
+                day DATE NOT NULL,
+                product_id INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                movement_type ENUM('receipt', 'delivery', 'transfer', 'adjustment') NOT NULL,
+                quantity_in BIGINT NOT NULL DEFAULT 0,
+                quantity_out BIGINT NOT NULL DEFAULT 0,
+                movement_count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, product_id, warehouse_id, movement_type)
+            )
+        ''',
+        create_index('receipts', 'idx_receipts_status_created', '(status, created_at)'),
+        create_index('delivery_orders', 'idx_delivery_orders_status_created', '(status, created_at)'),
+        create_index('internal_transfers', 'idx_internal_transfers_status_created', '(status, created_at)'),
+        create_index('stock_adjustments', 'idx_stock_adjustments_created', '(created_at)'),
+    ]),
+    (9, 'Operation queue', [
+        # Create operation_queue table (documents submitted in asynchronous mode)
+        '''
+            CREATE TABLE IF NOT EXISTS operation_queue (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                kind ENUM('receipt', 'delivery', 'transfer', 'adjustment') NOT NULL,
+                payload JSON NOT NULL,
+                created_by INT,
+                status ENUM('queued', 'done', 'failed') NOT NULL DEFAULT 'queued',
+                document_id INT NULL,
+                reference VARCHAR(100) NULL,
+                error TEXT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                processed_at TIMESTAMP NULL,
+                INDEX idx_operation_queue_status (status, id)
+            )
+        ''',
+    ]),
+    (10, 'Collection versions', [
+        # Create collection_versions table (ETag versions of cached lists, see models/http_cache.py)
+        '''
+            CREATE TABLE IF NOT EXISTS collection_versions (
+                name VARCHAR(32) PRIMARY KEY,
+                version BIGINT UNSIGNED NOT NULL DEFAULT 0
+            )
+        ''',
+        "INSERT IGNORE INTO collection_versions (name, version) VALUES ('products', 1), ('categories', 1), ('warehouses', 1)",
+    ]),
+    (11, 'Product stock summary', [
+        # Create product_stock_summary table (per-product totals, see models/stock_summary.py)
+        '''
+            CREATE TABLE IF NOT EXISTS product_stock_summary (
+                product_id INT PRIMARY KEY,
+                total_quantity BIGINT NOT NULL DEFAULT 0,
+                low_stock_lines INT NOT NULL DEFAULT 0,
+                FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+            )
+        ''',
+        '''
+            INSERT INTO product_stock_summary (product_id, total_quantity, low_stock_lines)
+            SELECT s.product_id, SUM(s.quantity), SUM(s.quantity < p.min_stock_level)
+            FROM stock s
+            JOIN products p ON p.id = s.product_id
+            GROUP BY s.product_id
+            ON DUPLICATE KEY UPDATE total_quantity = VALUES(total_quantity), low_stock_lines = VALUES(low_stock_lines)
+        ''',
+    ]),
+    (12, 'Stock reservations', [
+        # Units promised to confirmed delivery orders (see models/reservation.py)
+        add_column('stock', 'reserved', 'INT NOT NULL DEFAULT 0'),
+        add_column('stock', 'available', 'INT AS (quantity - reserved) VIRTUAL'),
+        # Open orders created before reservations already took their stock out
+        "UPDATE delivery_orders SET status = 'done' WHERE status IN ('draft', 'waiting', 'ready')",
+    ]),
+    (13, 'Receipt and transfer validation', [
+        # Stock of receipts and transfers now moves on validation (see
+        # models/document_state.py); open ones created before already moved it
+        "UPDATE receipts SET status = 'done' WHERE status IN ('draft', 'waiting', 'ready')",
+        "UPDATE internal_transfers SET status = 'done' WHERE status IN ('draft', 'waiting', 'ready')",
+    ]),
+    (14, 'Cycle counts', [
+        # Create cycle_counts table (count sessions, see models/cycle_count.py)
+        '''
+            CREATE TABLE IF NOT EXISTS cycle_counts (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                warehouse_id INT NULL,
+                reason TEXT,
+                status ENUM('open', 'applied', 'canceled') NOT NULL DEFAULT 'open',
+                started_movement_id BIGINT NOT NULL,
+                adjustment_id INT NULL,
+                adjusted_lines INT NOT NULL DEFAULT 0,
+                conflict_lines INT NOT NULL DEFAULT 0,
+                created_by INT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                applied_at TIMESTAMP NULL,
+                FOREIGN KEY (warehouse_id) REFERENCES warehouses(id),
+                FOREIGN KEY (created_by) REFERENCES users(id)
+            )
+        ''',
+        # Create cycle_count_lines table (latest counted quantity per stock line)
+        '''
+            CREATE TABLE IF NOT EXISTS cycle_count_lines (
+                count_id INT NOT NULL,
+                product_id INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                counted_quantity INT NOT NULL,
+                counted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (count_id, product_id, warehouse_id),
+                FOREIGN KEY (count_id) REFERENCES cycle_counts(id) ON DELETE CASCADE,
+                FOREIGN KEY (product_id) REFERENCES products(id),
+                FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
+            )
+        ''',
+    ]),
+    (15, 'Consumption statistics', [
+        # Create stock_line_daily table (inflow/outflow per stock line and day, see models/consumption.py)
+        '''
+            CREATE TABLE IF NOT EXISTS stock_line_daily (
+                product_id INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                day DATE NOT NULL,
+                quantity_in BIGINT NOT NULL DEFAULT 0,
+                quantity_out BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (product_id, warehouse_id, day),
+                INDEX idx_stock_line_daily_day (day)
+            )
+        ''',
+        # Create stock_line_stats table (running statistics per stock line)
+        '''
+            CREATE TABLE IF NOT EXISTS stock_line_stats (
+                product_id INT NOT NULL,
+                warehouse_id INT NOT NULL,
+                day DATE NOT NULL,
+                day_inflow BIGINT NOT NULL DEFAULT 0,
+                day_outflow BIGINT NOT NULL DEFAULT 0,
+                ewma_outflow DOUBLE NOT NULL DEFAULT 0,
+                last_movement_at DATETIME NULL,
+                PRIMARY KEY (product_id, warehouse_id)
+            )
+        ''',
+        # Backfill the last 30 days of buckets from the ledger
+        '''
+            INSERT INTO stock_line_daily (product_id, warehouse_id, day, quantity_in, quantity_out)
+            SELECT product_id, warehouse_id, DATE(created_at),
+                   SUM(GREATEST(quantity_change, 0)), SUM(GREATEST(-quantity_change, 0))
+            FROM stock_movements
+            WHERE created_at >= CURDATE() - INTERVAL 30 DAY
+            GROUP BY product_id, warehouse_id, DATE(created_at)
+            ON DUPLICATE KEY UPDATE quantity_in = VALUES(quantity_in), quantity_out = VALUES(quantity_out)
+        ''',
+        # Seed each line with today's totals and its 30-day average outflow
+        '''
+            INSERT INTO stock_line_stats (product_id, warehouse_id, day, day_inflow, day_outflow, ewma_outflow, last_movement_at)
+            SELECT m.product_id, m.warehouse_id, CURDATE(),
+                   COALESCE(d.today_in, 0), COALESCE(d.today_out, 0), COALESCE(d.average_out, 0), m.last_movement_at
+            FROM (
+                SELECT product_id, warehouse_id, MAX(created_at) as last_movement_at
+                FROM stock_movements
+                GROUP BY product_id, warehouse_id
+            ) m
+            LEFT JOIN (
+                SELECT product_id, warehouse_id,
+                       SUM(IF(day = CURDATE(), quantity_in, 0)) as today_in,
+                       SUM(IF(day = CURDATE(), quantity_out, 0)) as today_out,
+                       SUM(IF(day < CURDATE(), quantity_out, 0)) / 30 as average_out
+                FROM stock_line_daily
+                GROUP BY product_id, warehouse_id
+            ) d ON d.product_id = m.product_id AND d.warehouse_id = m.warehouse_id
+            ON DUPLICATE KEY UPDATE last_movement_at = VALUES(last_movement_at)
+        ''',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(cursor):
+    """Stored schema version; a single read of the end of the primary key."""
+    try:
+        cursor.execute('SELECT MAX(version) FROM schema_version')
+    except MySQLdb.ProgrammingError as e:
+        if e.args and e.args[0] == 1146:  # ER_NO_SUCH_TABLE: never migrated
+            return 0
+        raise
+    return cursor.fetchone()[0] or 0
+
+def migrate(target=None):
+    """Apply pending migrations up to `target` (default: latest). Returns the versions applied."""
+    target = LATEST_VERSION if target is None else target
+    applied = []
+    cursor = mysql.connection.cursor()
+    try:
+        # Serialize concurrent runners (e.g. several deploy hooks)
+        cursor.execute("SELECT GET_LOCK('schema_migrations', 60)")
+        if not cursor.fetchone()[0]:
+            raise RuntimeError('Timed out waiting for another migration run')
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            version = current_version(cursor)
+            for number, description, steps in MIGRATIONS:
+                if number <= version or number > target:
+                    continue
+                started = time.perf_counter()
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute('INSERT INTO schema_version (version, description) VALUES (%s, %s)',
+                               (number, description))
+                mysql.connection.commit()
+                applied.append(number)
+                print(f"✅ Migration {number}: {description} ({(time.perf_counter() - started) * 1000:.0f}ms)")
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+            cursor.fetchone()
+    except Exception as e:
+        mysql.connection.rollback()
+        print(f"❌ Migration error: {str(e)}")
+        raise e
+    finally:
+        cursor.close()
+    return applied
+
+def check_schema(app):
+    """Startup check: read the schema version and migrate only when AUTO_MIGRATE is set.
+
+    Must run inside an app context. Raises if the database is unreachable.
+    """
+    cursor = mysql.connection.cursor()
+    try:
+        version = current_version(cursor)
+    finally:
+        cursor.close()
+    if version < LATEST_VERSION:
+        if app.config.get('AUTO_MIGRATE'):
+            migrate()
+            return LATEST_VERSION
+        print(f"⚠️  Database schema is at version {version}, code expects {LATEST_VERSION}. "
+              f"Run: python -m models.migrations")
+    return version
+
+def main():
+    from flask import Flask
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Apply StockMaster schema migrations')
+    parser.add_argument('--target', type=int, help='migrate up to this version (default: latest)')
+    parser.add_argument('--status', action='store_true', help='only print the current and latest versions')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    mysql.init_app(app)
+    with app.app_context():
+        if args.status:
+            cursor = mysql.connection.cursor()
+            print(f"Schema version {current_version(cursor)} (latest {LATEST_VERSION})")
+            cursor.close()
+            return
+        applied = migrate(args.target)
+        if not applied:
+            print(f"✅ Schema already up to date (version {LATEST_VERSION})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+from models.database import mysql
+import MySQLdb.cursors
+from datetime import datetime, timedelta
+
+MOVEMENT_TYPES = ('receipt', 'delivery', 'transfer', 'adjustment')
+
+# Hot table first. Archiving moves the oldest movements first, so the archive
+# only holds rows that sort before every row still in the hot table.
+MOVEMENT_TIERS = ('stock_movements', 'stock_movements_archive')
+
+def union_tiers(select):
+    """UNION ALL of `select` (with a {table} placeholder) over every movement tier.
+
+    Parameters of `select` must be passed once per tier.
+    """
+    return '\nUNION ALL\n'.join(select.format(table=table) for table in MOVEMENT_TIERS)
+
+class StockMovement:
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+
+    @staticmethod
+    def encode_cursor(movement):
+        return f"{movement['created_at']:%Y%m%d%H%M%S}-{movement['id']}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            timestamp, movement_id = cursor.split('-', 1)
+            return datetime.strptime(timestamp, '%Y%m%d%H%M%S'), int(movement_id)
+        except (AttributeError, ValueError):
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+
+    @staticmethod
+    def search(movement_type=None, warehouse_id=None, start_date=None, end_date=None, cursor=None, limit=PAGE_SIZE):
+        """Return one page of movements, newest first, and the cursor of the next page.
+
+        Filters are applied in SQL and paging seeks past the last (created_at, id)
+        seen instead of using OFFSET, so every page costs the same index range
+        scan no matter how deep it is or how large the ledger grows.
+        `start_date`/`end_date` are inclusive dates.
+        """
+        limit = max(1, min(int(limit), StockMovement.MAX_PAGE_SIZE))
+        conditions, params = [], []
+        if movement_type:
+            if movement_type not in MOVEMENT_TYPES:
+                raise ValueError(f"Unknown movement type: {movement_type}")
+            conditions.append('m.movement_type = %s')
+            params.append(movement_type)
+        if warehouse_id:
+            conditions.append('m.warehouse_id = %s')
+            params.append(int(warehouse_id))
+        if start_date:
+            conditions.append('m.created_at >= %s')
+            params.append(start_date)
+        if end_date:
+            conditions.append('m.created_at < %s')
+            params.append(end_date + timedelta(days=1))
+        if cursor:
+            created_at, movement_id = StockMovement.decode_cursor(cursor)
+            conditions.append('(m.created_at < %s OR (m.created_at = %s AND m.id < %s))')
+            params.extend([created_at, created_at, movement_id])
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+
+        # Newest first: read the hot table, then the archive only if the page is not full yet
+        movements = []
+        db_cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        for table in MOVEMENT_TIERS:
+            remaining = limit + 1 - len(movements)
+            if remaining <= 0:
+                break
+            db_cursor.execute(f'''
+                SELECT m.id, m.product_id, m.warehouse_id, m.movement_type, m.reference_id,
+                       m.quantity_change, m.quantity_after, m.created_at,
+                       p.name as product_name, p.sku, w.name as warehouse_name
+                FROM {table} m
+                JOIN products p ON p.id = m.product_id
+                JOIN warehouses w ON w.id = m.warehouse_id
+                {where}
+                ORDER BY m.created_at DESC, m.id DESC
+                LIMIT %s
+            ''', params + [remaining])
+            movements.extend(db_cursor.fetchall())
+        db_cursor.close()
+
+        next_cursor = None
+        if len(movements) > limit:
+            movements = movements[:limit]
+            next_cursor = StockMovement.encode_cursor(movements[-1])
+        return movements, next_cursor
+
+    @staticmethod
+    def daily_totals(start_date, end_date, warehouse_id=None, product_id=None):
+        """Units in and out and movement count per day and type, `end_date` inclusive.
+
+        Archived days are read from the stock_movement_daily rollup, the rest
+        from the hot table.
+        """
+        filters, filter_params = '', []
+        for column, value in (('warehouse_id', warehouse_id), ('product_id', product_id)):
+            if value:
+                filters += f' AND {column} = %s'
+                filter_params.append(int(value))
+
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute(f'''
+            SELECT day, movement_type,
+                   CAST(SUM(quantity_in) AS SIGNED) as quantity_in,
+                   CAST(SUM(quantity_out) AS SIGNED) as quantity_out,
+                   CAST(SUM(movement_count) AS SIGNED) as movement_count
+            FROM (
+                SELECT day, movement_type, quantity_in, quantity_out, movement_count
+                FROM stock_movement_daily
+                WHERE day >= %s AND day <= %s{filters}
+                UNION ALL
+                SELECT DATE(created_at), movement_type, GREATEST(quantity_change, 0), GREATEST(-quantity_change, 0), 1
+                FROM stock_movements
+                WHERE created_at >= %s AND created_at < %s{filters}
+            ) t
+            GROUP BY day, movement_type
+            ORDER BY day, movement_type
+        ''', [start_date, end_date] + filter_params + [start_date, end_date + timedelta(days=1)] + filter_params)
+        totals = cursor.fetchall()
+        cursor.close()
+        return totals
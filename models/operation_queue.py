@@ -0,0 +1,224 @@
+from models.database import mysql, retry_on_deadlock
+from models.operations import Operations, DOCUMENT_KINDS
+from models.metrics import metrics
+import MySQLdb.cursors
+import argparse
+import inspect
+import json
+import threading
+import time
+
+# Errors that retrying the same payload cannot fix: the document is marked
+# failed. Anything else (lost connections, lock waits that outlasted
+# retry_on_deadlock) leaves it queued for a later pass.
+PERMANENT_ERRORS = (ValueError, LookupError, TypeError, MySQLdb.IntegrityError, MySQLdb.DataError)
+
+class OperationQueue:
+    """Durable outbox for documents submitted in asynchronous mode.
+
+    A request only inserts the document into operation_queue and commits, so
+    its latency no longer depends on how long the stock transaction takes.
+    Worker threads claim up to BATCH_SIZE queued documents with FOR UPDATE
+    SKIP LOCKED (so workers never wait on each other) and create them all in
+    one transaction through Operations.create_documents: one commit for the
+    whole group, and one stock row update per (product, warehouse) however
+    many queued lines hit the same SKU. If a group fails on its data, its
+    documents are retried one at a time so a single bad document only fails
+    itself; operational errors leave the whole group queued.
+
+    Run workers with: python -m models.operation_queue [--threads N]
+    """
+    BATCH_SIZE = 100
+    POLL_INTERVAL = 0.2
+
+    @staticmethod
+    def init_app(app):
+        OperationQueue.BATCH_SIZE = app.config.get('OPERATION_QUEUE_BATCH_SIZE', OperationQueue.BATCH_SIZE)
+        OperationQueue.POLL_INTERVAL = app.config.get('OPERATION_QUEUE_POLL_INTERVAL', OperationQueue.POLL_INTERVAL)
+
+    @staticmethod
+    def validate(kind, fields):
+        if kind not in DOCUMENT_KINDS:
+            raise ValueError(f"Unknown document kind: {kind}")
+        expected = set(inspect.signature(DOCUMENT_KINDS[kind][0]).parameters) - {'cursor'}
+        if set(fields) != expected:
+            raise ValueError(f"A {kind} needs exactly these fields: {', '.join(sorted(expected))}")
+        for key in ('warehouse_id', 'from_warehouse_id', 'to_warehouse_id'):
+            if key in fields and not OperationQueue.is_int(fields[key]):
+                raise ValueError(f"Field {key} must be an integer")
+        items = fields.get('items')
+        if not isinstance(items, list) or not items:
+            raise ValueError('A document needs at least one item')
+        if kind == 'adjustment':
+            item_keys = ('product_id', 'warehouse_id', 'current_quantity', 'new_quantity')
+        else:
+            item_keys = ('product_id', 'quantity')
+        for item in items:
+            if not isinstance(item, dict):
+                raise ValueError('Each item must be an object')
+            for key in item_keys:
+                if not OperationQueue.is_int(item.get(key)):
+                    raise ValueError(f"Item field {key} must be an integer")
+            if kind == 'adjustment':
+                if item['new_quantity'] < 0:
+                    raise ValueError('Item field new_quantity must not be negative')
+            elif item['quantity'] <= 0:
+                raise ValueError('Item field quantity must be positive')
+
+    @staticmethod
+    def is_int(value):
+        # bool is an int subclass but never a valid id or quantity
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    @staticmethod
+    def enqueue(kind, fields):
+        """Queue a document for the workers. Returns the queue id to poll."""
+        OperationQueue.validate(kind, fields)
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('''
+                INSERT INTO operation_queue (kind, payload, created_by)
+                VALUES (%s, %s, %s)
+            ''', (kind, json.dumps(fields), fields.get('created_by')))
+            mysql.connection.commit()
+            return cursor.lastrowid
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def get(queue_id):
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute('''
+            SELECT id, kind, status, document_id, reference, error, created_at, processed_at
+            FROM operation_queue
+            WHERE id = %s
+        ''', (queue_id,))
+        entry = cursor.fetchone()
+        cursor.close()
+        return entry
+
+    @staticmethod
+    def pending():
+        cursor = mysql.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM operation_queue WHERE status = 'queued'")
+        count = cursor.fetchone()[0]
+        cursor.close()
+        return count
+
+    @staticmethod
+    @retry_on_deadlock
+    def process_batch(limit=None, ids=None):
+        """Create up to `limit` queued documents in one transaction. Returns how many were claimed."""
+        claimed = []
+        cursor = mysql.connection.cursor()
+        try:
+            if ids:
+                cursor.execute('''
+                    SELECT id, kind, payload FROM operation_queue
+                    WHERE id IN (%s) AND status = 'queued'
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                ''' % ', '.join(['%s'] * len(ids)), ids)
+            else:
+                cursor.execute('''
+                    SELECT id, kind, payload FROM operation_queue
+                    WHERE status = 'queued'
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ''', (limit or OperationQueue.BATCH_SIZE,))
+            claimed = cursor.fetchall()
+            if not claimed:
+                mysql.connection.rollback()
+                return 0
+
+            started = time.perf_counter()
+            created, movement_count = Operations.create_documents([(kind, json.loads(payload))
+                                                                   for _, kind, payload in claimed])
+            cursor.executemany('''
+                UPDATE operation_queue
+                SET status = 'done', document_id = %s, reference = %s, processed_at = NOW()
+                WHERE id = %s
+            ''', [(document_id, reference, queue_id)
+                  for (queue_id, _, _), (document_id, reference) in zip(claimed, created)])
+            mysql.connection.commit()
+            metrics.operations.observe(time.perf_counter() - started, 'queue_batch')
+            metrics.operation_lines.observe(len(claimed), 'queue_batch')
+            Operations.count_committed([kind for _, kind, _ in claimed], movement_count)
+            return len(claimed)
+        except Exception as e:
+            mysql.connection.rollback()
+            if ids or not claimed or isinstance(e, (MySQLdb.OperationalError, MySQLdb.InterfaceError)):
+                raise e
+            # Isolate the failing document: one transaction per document of the group
+            print(f"⚠️  Queue batch of {len(claimed)} failed ({str(e)}), retrying one by one")
+            for queue_id, _, _ in claimed:
+                OperationQueue._process_one(queue_id)
+            return len(claimed)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _process_one(queue_id):
+        try:
+            OperationQueue.process_batch(ids=[queue_id])
+        except PERMANENT_ERRORS as e:
+            OperationQueue._fail(queue_id, str(e))
+
+    @staticmethod
+    def _fail(queue_id, error):
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('''
+                UPDATE operation_queue
+                SET status = 'failed', error = %s, processed_at = NOW()
+                WHERE id = %s AND status = 'queued'
+            ''', (error[:1000], queue_id))
+            mysql.connection.commit()
+            print(f"❌ Queued document {queue_id} failed: {error}")
+        except Exception:
+            mysql.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def work(app, stop):
+        """Worker loop: drain the queue, sleeping POLL_INTERVAL whenever it is empty."""
+        while not stop.is_set():
+            try:
+                with app.app_context():
+                    processed = OperationQueue.process_batch()
+            except Exception as e:
+                print(f"❌ Queue worker error: {str(e)}")
+                processed = 0
+            if processed < OperationQueue.BATCH_SIZE:
+                stop.wait(OperationQueue.POLL_INTERVAL)
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Process queued documents')
+    parser.add_argument('--threads', type=int, default=2)
+    args = parser.parse_args()
+
+    app = create_app()
+    stop = threading.Event()
+    workers = [threading.Thread(target=OperationQueue.work, args=(app, stop), daemon=True)
+               for _ in range(args.threads)]
+    for worker in workers:
+        worker.start()
+    print(f"🚀 Queue workers started ({args.threads} threads, batches of {OperationQueue.BATCH_SIZE})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+if __name__ == '__main__':
+    main()
@@ -1,173 +1,269 @@
-from models.database import mysql
+from models.database import mysql, retry_on_deadlock
+from models.kpi import KPI
+from models.alert import LowStockAlert
+from models.stock_summary import StockSummary
+from models.consumption import ConsumptionStats
+from models.reference import references
+from models.metrics import metrics
 import MySQLdb.cursors
-from datetime import datetime
-import random
-import string
+from collections import namedtuple
+import time
+
+# One stock change produced by a document line
+StockDelta = namedtuple('StockDelta', ['product_id', 'warehouse_id', 'quantity_change', 'movement_type', 'reference_id'])
 
 class Operations:
     @staticmethod
     def generate_reference(prefix):
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        return f"{prefix}-{timestamp}-{random_str}"
+        return references.next(prefix)
 
     @staticmethod
-    def create_receipt(supplier, warehouse_id, items, created_by):
+    def insert_receipt(cursor, supplier, warehouse_id, items, created_by):
+        """Insert a receipt with its items. Returns (id, reference, stock deltas); no commit."""
+        reference = Operations.generate_reference('REC')
+
+        # Create receipt
+        cursor.execute('''
+            INSERT INTO receipts (reference, supplier, created_by)
+            VALUES (%s, %s, %s)
+        ''', (reference, supplier, created_by))
+        receipt_id = cursor.lastrowid
+
+        # Add receipt items
+        cursor.executemany('''
+            INSERT INTO receipt_items (receipt_id, product_id, quantity, warehouse_id)
+            VALUES (%s, %s, %s, %s)
+        ''', [(receipt_id, item['product_id'], item['quantity'], warehouse_id) for item in items])
+
+        # Stock only arrives when the receipt is validated
+        return receipt_id, reference, []
+
+    @staticmethod
+    def insert_delivery_order(cursor, customer, warehouse_id, items, created_by):
+        """Insert a delivery order with its items. Returns (id, reference, stock deltas); no commit."""
+        reference = Operations.generate_reference('DO')
+
+        # Create delivery order
+        cursor.execute('''
+            INSERT INTO delivery_orders (reference, customer, created_by)
+            VALUES (%s, %s, %s)
+        ''', (reference, customer, created_by))
+        delivery_id = cursor.lastrowid
+
+        # Add delivery items
+        cursor.executemany('''
+            INSERT INTO delivery_order_items (delivery_order_id, product_id, quantity, warehouse_id)
+            VALUES (%s, %s, %s, %s)
+        ''', [(delivery_id, item['product_id'], item['quantity'], warehouse_id) for item in items])
+
+        # Stock is reserved on confirmation and only leaves on validation
+        return delivery_id, reference, []
+
+    @staticmethod
+    def insert_internal_transfer(cursor, from_warehouse_id, to_warehouse_id, items, created_by):
+        """Insert a transfer with its items. Returns (id, reference, stock deltas); no commit."""
+        reference = Operations.generate_reference('TRF')
+
+        # Create transfer
+        cursor.execute('''
+            INSERT INTO internal_transfers (reference, from_warehouse_id, to_warehouse_id, created_by)
+            VALUES (%s, %s, %s, %s)
+        ''', (reference, from_warehouse_id, to_warehouse_id, created_by))
+        transfer_id = cursor.lastrowid
+
+        # Add transfer items
+        cursor.executemany('''
+            INSERT INTO internal_transfer_items (transfer_id, product_id, quantity)
+            VALUES (%s, %s, %s)
+        ''', [(transfer_id, item['product_id'], item['quantity']) for item in items])
+
+        # Stock is reserved at the source on confirmation and moves on validation
+        return transfer_id, reference, []
+
+    @staticmethod
+    def insert_stock_adjustment(cursor, reason, items, created_by):
+        """Insert an adjustment with its items. Returns (id, reference, stock deltas); no commit."""
+        reference = Operations.generate_reference('ADJ')
+
+        # Create adjustment
+        cursor.execute('''
+            INSERT INTO stock_adjustments (reference, reason, created_by)
+            VALUES (%s, %s, %s)
+        ''', (reference, reason, created_by))
+        adjustment_id = cursor.lastrowid
+
+        # Add adjustment items
+        cursor.executemany('''
+            INSERT INTO stock_adjustment_items (adjustment_id, product_id, warehouse_id, quantity_before, quantity_after)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', [(adjustment_id, item['product_id'], item['warehouse_id'], item['current_quantity'], item['new_quantity'])
+              for item in items])
+
+        # Differences between counted and recorded quantities
+        return adjustment_id, reference, [
+            StockDelta(item['product_id'], item['warehouse_id'],
+                       item['new_quantity'] - item['current_quantity'], 'adjustment', adjustment_id)
+            for item in items
+        ]
+
+    @staticmethod
+    def create_documents(documents):
+        """Create several documents of any kind in the caller's transaction.
+
+        `documents` holds (kind, fields) pairs where kind is a DOCUMENT_KINDS key
+        and fields are the keyword arguments of its insert_* method. All stock
+        changes go through a single apply_stock_deltas call, so lines of
+        different documents on the same stock row become one row update.
+        Does not commit. Returns one (id, reference) per document and the number
+        of stock movements logged.
+        """
+        created, deltas, kpi_changes = [], [], {}
         cursor = mysql.connection.cursor()
         try:
-            reference = Operations.generate_reference('REC')
-            
-            # Create receipt
-            cursor.execute('''
-                INSERT INTO receipts (reference, supplier, created_by)
-                VALUES (%s, %s, %s)
-            ''', (reference, supplier, created_by))
-            receipt_id = cursor.lastrowid
-            
-            # Add receipt items
-            for item in items:
-                cursor.execute('''
-                    INSERT INTO receipt_items (receipt_id, product_id, quantity, warehouse_id)
-                    VALUES (%s, %s, %s, %s)
-                ''', (receipt_id, item['product_id'], item['quantity'], warehouse_id))
-                
-                # Update stock
-                Operations.update_stock(item['product_id'], warehouse_id, item['quantity'], 'receipt', receipt_id)
-            
-            mysql.connection.commit()
-            return True
-        except Exception as e:
-            mysql.connection.rollback()
-            raise e
+            for kind, fields in documents:
+                insert, counter = DOCUMENT_KINDS[kind]
+                document_id, reference, document_deltas = insert(cursor, **fields)
+                created.append((document_id, reference))
+                deltas.extend(document_deltas)
+                if counter:
+                    kpi_changes[counter] = kpi_changes.get(counter, 0) + 1
+            Operations.apply_stock_deltas(deltas)
+            KPI.bump(cursor, kpi_changes)
+            return created, sum(1 for delta in deltas if delta.quantity_change != 0)
         finally:
             cursor.close()
 
     @staticmethod
-    def create_delivery_order(customer, warehouse_id, items, created_by):
-        cursor = mysql.connection.cursor()
+    @retry_on_deadlock
+    def create(kind, **fields):
+        """Create and commit one document. Returns (id, reference)."""
+        started = time.perf_counter()
         try:
-            reference = Operations.generate_reference('DO')
-            
-            # Create delivery order
-            cursor.execute('''
-                INSERT INTO delivery_orders (reference, customer, created_by)
-                VALUES (%s, %s, %s)
-            ''', (reference, customer, created_by))
-            delivery_id = cursor.lastrowid
-            
-            # Add delivery items
-            for item in items:
-                cursor.execute('''
-                    INSERT INTO delivery_order_items (delivery_order_id, product_id, quantity, warehouse_id)
-                    VALUES (%s, %s, %s, %s)
-                ''', (delivery_id, item['product_id'], item['quantity'], warehouse_id))
-                
-                # Update stock (negative quantity for delivery)
-                Operations.update_stock(item['product_id'], warehouse_id, -item['quantity'], 'delivery', delivery_id)
-            
+            created, movement_count = Operations.create_documents([(kind, fields)])
             mysql.connection.commit()
-            return True
         except Exception as e:
             mysql.connection.rollback()
             raise e
-        finally:
-            cursor.close()
+        operation = f'create_{kind}'
+        metrics.operations.observe(time.perf_counter() - started, operation)
+        metrics.operation_lines.observe(len(fields['items']), operation)
+        Operations.count_committed([kind], movement_count)
+        return created[0]
+
+    @staticmethod
+    def count_committed(kinds, movement_count):
+        for kind in kinds:
+            metrics.documents.inc(1, kind)
+        metrics.movements.inc(movement_count)
+
+    @staticmethod
+    def create_receipt(supplier, warehouse_id, items, created_by):
+        Operations.create('receipt', supplier=supplier, warehouse_id=warehouse_id,
+                          items=items, created_by=created_by)
+        return True
+
+    @staticmethod
+    def create_delivery_order(customer, warehouse_id, items, created_by):
+        Operations.create('delivery', customer=customer, warehouse_id=warehouse_id,
+                          items=items, created_by=created_by)
+        return True
 
     @staticmethod
     def create_internal_transfer(from_warehouse_id, to_warehouse_id, items, created_by):
-        cursor = mysql.connection.cursor()
-        try:
-            reference = Operations.generate_reference('TRF')
-            
-            # Create transfer
-            cursor.execute('''
-                INSERT INTO internal_transfers (reference, from_warehouse_id, to_warehouse_id, created_by)
-                VALUES (%s, %s, %s, %s)
-            ''', (reference, from_warehouse_id, to_warehouse_id, created_by))
-            transfer_id = cursor.lastrowid
-            
-            # Add transfer items
-            for item in items:
-                cursor.execute('''
-                    INSERT INTO internal_transfer_items (transfer_id, product_id, quantity)
-                    VALUES (%s, %s, %s)
-                ''', (transfer_id, item['product_id'], item['quantity']))
-                
-                # Update stock for both warehouses
-                Operations.update_stock(item['product_id'], from_warehouse_id, -item['quantity'], 'transfer', transfer_id)
-                Operations.update_stock(item['product_id'], to_warehouse_id, item['quantity'], 'transfer', transfer_id)
-            
-            mysql.connection.commit()
-            return True
-        except Exception as e:
-            mysql.connection.rollback()
-            raise e
-        finally:
-            cursor.close()
+        Operations.create('transfer', from_warehouse_id=from_warehouse_id, to_warehouse_id=to_warehouse_id,
+                          items=items, created_by=created_by)
+        return True
 
     @staticmethod
     def create_stock_adjustment(reason, items, created_by):
+        Operations.create('adjustment', reason=reason, items=items, created_by=created_by)
+        return True
+
+    @staticmethod
+    @metrics.timed('apply_stock_deltas')
+    def apply_stock_deltas(deltas):
+        """Apply every stock change of a document with a fixed number of statements.
+
+        Runs one multi-row upsert on stock, one read-back of the touched rows and
+        one multi-row insert into stock_movements, whatever the number of lines.
+        Quantities are changed by the database itself (quantity = quantity + delta)
+        and rows are written, and therefore locked, in (product_id, warehouse_id)
+        order so concurrent documents cannot deadlock on each other's rows.
+        Does not commit; the caller owns the transaction. Returns a dict mapping
+        (product_id, warehouse_id) to the resulting quantity.
+        """
+        deltas = [delta for delta in deltas if delta.quantity_change != 0]
+        if not deltas:
+            return {}
+        metrics.operation_lines.observe(len(deltas), 'apply_stock_deltas')
+
+        # Net change per stock row
+        totals = {}
+        for delta in deltas:
+            key = (int(delta.product_id), int(delta.warehouse_id))
+            totals[key] = totals.get(key, 0) + delta.quantity_change
+        keys = sorted(totals)
+
         cursor = mysql.connection.cursor()
         try:
-            reference = Operations.generate_reference('ADJ')
-            
-            # Create adjustment
-            cursor.execute('''
-                INSERT INTO stock_adjustments (reference, reason, created_by)
+            # Apply all net changes at once, locking rows in key order
+            cursor.executemany('''
+                INSERT INTO stock (product_id, warehouse_id, quantity)
                 VALUES (%s, %s, %s)
-            ''', (reference, reason, created_by))
-            adjustment_id = cursor.lastrowid
-            
-            # Add adjustment items
-            for item in items:
-                cursor.execute('''
-                    INSERT INTO stock_adjustment_items (adjustment_id, product_id, warehouse_id, quantity_before, quantity_after)
-                    VALUES (%s, %s, %s, %s, %s)
-                ''', (adjustment_id, item['product_id'], item['warehouse_id'], item['current_quantity'], item['new_quantity']))
-                
-                # Calculate difference and update stock
-                quantity_diff = item['new_quantity'] - item['current_quantity']
-                if quantity_diff != 0:
-                    Operations.update_stock(item['product_id'], item['warehouse_id'], quantity_diff, 'adjustment', adjustment_id)
-            
-            mysql.connection.commit()
-            return True
-        except Exception as e:
-            mysql.connection.rollback()
-            raise e
+                ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)
+            ''', [(product_id, warehouse_id, totals[(product_id, warehouse_id)]) for product_id, warehouse_id in keys])
+
+            # Read back resulting quantities (rows stay locked until commit)
+            params = [value for key in keys for value in key]
+            cursor.execute('''
+                SELECT s.product_id, s.warehouse_id, s.quantity, COALESCE(p.min_stock_level, 0)
+                FROM stock s
+                JOIN products p ON p.id = s.product_id
+                WHERE (s.product_id, s.warehouse_id) IN (%s)
+                FOR UPDATE OF s
+            ''' % ', '.join(['(%s, %s)'] * len(keys)), params)
+            rows = cursor.fetchall()
+            quantities = {(row[0], row[1]): row[2] for row in rows}
+
+            # Log movements, chaining quantity_after from the pre-document quantity
+            running = {key: quantities[key] - change for key, change in totals.items()}
+            movements = []
+            for delta in deltas:
+                key = (int(delta.product_id), int(delta.warehouse_id))
+                running[key] += delta.quantity_change
+                movements.append((delta.product_id, delta.warehouse_id, delta.movement_type,
+                                  delta.reference_id, delta.quantity_change, running[key]))
+            cursor.executemany('''
+                INSERT INTO stock_movements (product_id, warehouse_id, movement_type, reference_id, quantity_change, quantity_after)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ''', movements)
+
+            # Flag or clear low-stock alerts for lines crossing their minimum
+            lines = [
+                (product_id, warehouse_id, quantity - totals[(product_id, warehouse_id)], quantity, min_level)
+                for product_id, warehouse_id, quantity, min_level in rows
+            ]
+            low_stock_change = LowStockAlert.apply_crossings(cursor, lines)
+            StockSummary.apply(cursor, lines)
+            ConsumptionStats.apply(cursor, deltas)
+            KPI.bump(cursor, {'low_stock': low_stock_change})
+
+            return quantities
         finally:
             cursor.close()
 
     @staticmethod
+    @metrics.timed('update_stock')
     def update_stock(product_id, warehouse_id, quantity_change, movement_type, reference_id):
-        cursor = mysql.connection.cursor()
-        try:
-            # Get current stock
-            cursor.execute('''
-                SELECT quantity FROM stock 
-                WHERE product_id = %s AND warehouse_id = %s
-            ''', (product_id, warehouse_id))
-            current_stock = cursor.fetchone()
-            
-            if current_stock:
-                new_quantity = current_stock[0] + quantity_change
-                cursor.execute('''
-                    UPDATE stock 
-                    SET quantity = %s 
-                    WHERE product_id = %s AND warehouse_id = %s
-                ''', (new_quantity, product_id, warehouse_id))
-            else:
-                new_quantity = quantity_change
-                cursor.execute('''
-                    INSERT INTO stock (product_id, warehouse_id, quantity)
-                    VALUES (%s, %s, %s)
-                ''', (product_id, warehouse_id, new_quantity))
-            
-            # Log movement
-            cursor.execute('''
-                INSERT INTO stock_movements (product_id, warehouse_id, movement_type, reference_id, quantity_change, quantity_after)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            ''', (product_id, warehouse_id, movement_type, reference_id, quantity_change, new_quantity))
-            
-        except Exception as e:
-            raise e
\ No newline at end of file
+        quantities = Operations.apply_stock_deltas([
+            StockDelta(product_id, warehouse_id, quantity_change, movement_type, reference_id)
+        ])
+        return quantities.get((int(product_id), int(warehouse_id)))
+
+# Document kind -> (insert method, KPI counter bumped per new document)
+DOCUMENT_KINDS = {
+    'receipt': (Operations.insert_receipt, 'receipts.draft'),
+    'delivery': (Operations.insert_delivery_order, 'deliveries.draft'),
+    'transfer': (Operations.insert_internal_transfer, 'transfers.draft'),
+    'adjustment': (Operations.insert_stock_adjustment, None),
+}
@@ -1,4 +1,8 @@
-from models.database import mysql
+from models.database import mysql, retry_on_deadlock
+from models.kpi import KPI
+from models.alert import LowStockAlert
+from models.stock_summary import StockSummary
+from models.http_cache import CollectionVersion
 import MySQLdb.cursors
 
 class Product:
@@ -46,6 +50,8 @@ class Product:
                 INSERT INTO products (name, sku, category_id, unit_of_measure, description, min_stock_level)
                 VALUES (%s, %s, %s, %s, %s, %s)
             ''', (name, sku, category_id, unit_of_measure, description, min_stock_level))
+            CollectionVersion.bump(cursor, 'products')
+            KPI.bump(cursor, {'total_products': 1})
             mysql.connection.commit()
             return True
         except Exception as e:
@@ -55,15 +61,28 @@ class Product:
             cursor.close()
 
     @staticmethod
+    @retry_on_deadlock
     def update(product_id, name, sku, category_id, unit_of_measure, description, min_stock_level):
         cursor = mysql.connection.cursor()
         try:
+            cursor.execute('SELECT min_stock_level FROM products WHERE id = %s FOR UPDATE', (product_id,))
+            current = cursor.fetchone()
+
             cursor.execute('''
                 UPDATE products 
                 SET name = %s, sku = %s, category_id = %s, unit_of_measure = %s, 
                     description = %s, min_stock_level = %s
                 WHERE id = %s
             ''', (name, sku, category_id, unit_of_measure, description, min_stock_level, product_id))
+
+            # Re-evaluate low-stock alerts when the threshold moves
+            low_stock_change = 0
+            if current and int(current[0] or 0) != int(min_stock_level or 0):
+                low_stock_change = LowStockAlert.reevaluate_products(cursor, [product_id])
+                StockSummary.recount_low_lines(cursor, [product_id])
+            CollectionVersion.bump(cursor, 'products')
+            KPI.bump(cursor, {'low_stock': low_stock_change})
+
             mysql.connection.commit()
             return True
         except Exception as e:
@@ -77,6 +96,9 @@ class Product:
         cursor = mysql.connection.cursor()
         try:
             cursor.execute('DELETE FROM products WHERE id = %s', (product_id,))
+            deleted = cursor.rowcount
+            CollectionVersion.bump(cursor, 'products')
+            KPI.bump(cursor, {'total_products': -deleted})
             mysql.connection.commit()
             return True
         except Exception as e:
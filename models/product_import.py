@@ -0,0 +1,172 @@
+from models.database import mysql, retry_on_deadlock
+from models.kpi import KPI
+from models.alert import LowStockAlert
+from models.stock_summary import StockSummary
+from models.http_cache import CollectionVersion
+import csv
+import io
+import json
+
+class ProductImport:
+    """Streaming bulk import of products from CSV or JSON lines.
+
+    Rows are read one at a time and handled in chunks of CHUNK_SIZE: every
+    chunk validates its SKUs with one query, upserts with one multi-row
+    statement on the products.sku unique key and commits, so memory stays flat
+    and a bad chunk never rolls back the ones before it. Categories may be
+    given by `category_id` or by `category` name.
+    """
+    CHUNK_SIZE = 1000
+    MAX_REPORTED_ERRORS = 1000
+    FORMATS = ('csv', 'jsonl')
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.categories_by_id = {}
+        self.categories_by_name = {}
+        self.report = {'rows': 0, 'inserted': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+    @staticmethod
+    def detect_format(filename):
+        if filename and filename.lower().endswith(('.jsonl', '.ndjson', '.json')):
+            return 'jsonl'
+        return 'csv'
+
+    @staticmethod
+    def iter_rows(stream, fmt):
+        """Yield (line_number, row_dict_or_error) from a binary stream."""
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, row
+        elif fmt == 'jsonl':
+            for line_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, ValueError(f"invalid JSON: {e}")
+                    continue
+                yield line_number, row if isinstance(row, dict) else ValueError('expected a JSON object')
+        else:
+            raise ValueError(f"Unsupported import format: {fmt}")
+
+    def run(self, stream, fmt):
+        self._load_categories()
+        chunk = []
+        for line_number, row in ProductImport.iter_rows(stream, fmt):
+            self.report['rows'] += 1
+            if isinstance(row, Exception):
+                self._error(line_number, None, str(row))
+                continue
+            try:
+                chunk.append((line_number, self._validate(row)))
+            except ValueError as e:
+                self._error(line_number, row.get('sku'), str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        return self.report
+
+    def _error(self, line_number, sku, message):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < ProductImport.MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'line': line_number, 'sku': sku, 'error': message})
+
+    def _load_categories(self):
+        # The category table is small; one read serves every chunk
+        cursor = mysql.connection.cursor()
+        cursor.execute('SELECT id, name FROM product_categories')
+        for category_id, name in cursor.fetchall():
+            self.categories_by_id[category_id] = name
+            self.categories_by_name[name.strip().lower()] = category_id
+        cursor.close()
+
+    def _validate(self, row):
+        sku = str(row.get('sku') or '').strip()
+        name = str(row.get('name') or '').strip()
+        if not sku:
+            raise ValueError('sku is required')
+        if len(sku) > 100:
+            raise ValueError('sku is longer than 100 characters')
+        if not name:
+            raise ValueError('name is required')
+        if len(name) > 255:
+            raise ValueError('name is longer than 255 characters')
+
+        category_id = None
+        if row.get('category_id') not in (None, ''):
+            try:
+                category_id = int(row['category_id'])
+            except (TypeError, ValueError):
+                raise ValueError(f"category_id {row['category_id']!r} is not a number")
+            if category_id not in self.categories_by_id:
+                raise ValueError(f"unknown category_id {category_id}")
+        elif row.get('category'):
+            category_id = self.categories_by_name.get(str(row['category']).strip().lower())
+            if category_id is None:
+                raise ValueError(f"unknown category {row['category']!r}")
+
+        try:
+            min_stock_level = int(row.get('min_stock_level') or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"min_stock_level {row['min_stock_level']!r} is not a number")
+        if min_stock_level < 0:
+            raise ValueError('min_stock_level must not be negative')
+
+        return (name, sku, category_id, (row.get('unit_of_measure') or None),
+                (row.get('description') or None), min_stock_level)
+
+    def _import_chunk(self, chunk):
+        # Later rows win over earlier rows with the same SKU
+        by_sku = {}
+        for line_number, values in chunk:
+            if values[1] in by_sku:
+                self._error(by_sku[values[1]][0], values[1], f"superseded by line {line_number} with the same sku")
+            by_sku[values[1]] = (line_number, values)
+        try:
+            inserted, updated = self._upsert_chunk(by_sku)
+            self.report['inserted'] += inserted
+            self.report['updated'] += updated
+        except Exception as e:
+            for line_number, values in by_sku.values():
+                self._error(line_number, values[1], f"chunk failed: {e}")
+
+    @retry_on_deadlock
+    def _upsert_chunk(self, by_sku):
+        cursor = mysql.connection.cursor()
+        try:
+            skus = sorted(by_sku)
+            cursor.execute('SELECT sku, id, min_stock_level FROM products WHERE sku IN (%s) FOR UPDATE'
+                           % ', '.join(['%s'] * len(skus)), skus)
+            existing = {sku: (product_id, min_level) for sku, product_id, min_level in cursor.fetchall()}
+
+            cursor.executemany('''
+                INSERT INTO products (name, sku, category_id, unit_of_measure, description, min_stock_level)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE name = VALUES(name), category_id = VALUES(category_id),
+                    unit_of_measure = VALUES(unit_of_measure), description = VALUES(description),
+                    min_stock_level = VALUES(min_stock_level)
+            ''', [by_sku[sku][1] for sku in skus])
+
+            # Updated products whose threshold moved need their alerts re-evaluated
+            changed = [existing[sku][0] for sku in skus
+                       if sku in existing and existing[sku][1] != by_sku[sku][1][5]]
+            inserted = len(skus) - len(existing)
+            low_stock_change = LowStockAlert.reevaluate_products(cursor, changed)
+            StockSummary.recount_low_lines(cursor, changed)
+            CollectionVersion.bump(cursor, 'products')
+            KPI.bump(cursor, {'total_products': inserted, 'low_stock': low_stock_change})
+
+            mysql.connection.commit()
+            return inserted, len(existing)
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
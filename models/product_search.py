@@ -0,0 +1,75 @@
+from models.database import mysql
+import MySQLdb.cursors
+import re
+
+class ProductSearch:
+    """Ranked product lookup for autocomplete boxes.
+
+    Matches come from three index-backed sources, best first: SKU prefix
+    (unique index on sku), name prefix (idx_products_name), then an ngram
+    full-text phrase match over name and description. Each source is a LIMITed
+    index read, so cost does not grow with the catalog.
+    """
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+    # Default innodb_ft_min_token_size for the ngram parser (ngram_token_size)
+    MIN_FULLTEXT_LENGTH = 2
+
+    @staticmethod
+    def _like_prefix(query):
+        return re.sub(r'([\\%_])', r'\\\1', query) + '%'
+
+    @staticmethod
+    def autocomplete(query, limit=DEFAULT_LIMIT):
+        query = (query or '').strip()
+        if not query:
+            return []
+        limit = max(1, min(int(limit), ProductSearch.MAX_LIMIT))
+        prefix = ProductSearch._like_prefix(query)
+
+        results, seen = [], set()
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            def collect(rows):
+                for row in rows:
+                    if row['id'] not in seen and len(results) < limit:
+                        seen.add(row['id'])
+                        results.append(row)
+
+            # SKU prefix matches (an exact SKU sorts first)
+            cursor.execute('''
+                SELECT id, sku, name, unit_of_measure FROM products
+                WHERE sku LIKE %s
+                ORDER BY sku
+                LIMIT %s
+            ''', (prefix, limit))
+            collect(cursor.fetchall())
+
+            # Name prefix matches
+            if len(results) < limit:
+                cursor.execute('''
+                    SELECT id, sku, name, unit_of_measure FROM products
+                    WHERE name LIKE %s
+                    ORDER BY name
+                    LIMIT %s
+                ''', (prefix, limit))
+                collect(cursor.fetchall())
+
+            # Substring matches anywhere in name or description, by relevance
+            if len(results) < limit and len(query) >= ProductSearch.MIN_FULLTEXT_LENGTH:
+                phrase = '"%s"' % query.replace('"', ' ')
+                cursor.execute('''
+                    SELECT id, sku, name, unit_of_measure,
+                           MATCH(name, description) AGAINST (%s IN BOOLEAN MODE) AS score
+                    FROM products
+                    WHERE MATCH(name, description) AGAINST (%s IN BOOLEAN MODE)
+                    ORDER BY score DESC
+                    LIMIT %s
+                ''', (phrase, phrase, limit + len(results)))
+                collect(cursor.fetchall())
+        finally:
+            cursor.close()
+
+        for row in results:
+            row.pop('score', None)
+        return results
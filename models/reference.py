@@ -0,0 +1,90 @@
+from models.database import mysql
+from datetime import datetime
+import os
+import threading
+
+class ReferenceGenerator:
+    """Unique, increasing document references such as REC-20261018-00000042.
+
+    Numbers come from one row per prefix in document_sequences. A process
+    reserves BLOCK_SIZE numbers with a single atomic UPDATE and hands them out
+    from memory, so most documents need no round trip for their reference and
+    two processes can never receive the same number. Blocks are allocated on a
+    separate pooled connection and committed at once: the sequence row is
+    never locked for the length of a document transaction, and numbers from
+    rolled-back documents are simply skipped. Refills are serialized per
+    prefix only, so at most one extra connection per prefix is in use.
+    """
+    BLOCK_SIZE = 100
+
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._blocks = {}  # prefix -> [next_value, last_value]
+        self._refill_locks = {}  # prefix -> lock held while its block is refilled
+        self._allocations = 0
+
+    def init_app(self, app):
+        self.block_size = app.config.get('REFERENCE_BLOCK_SIZE', self.block_size)
+
+    def _take(self, prefix):
+        """Next number of the prefix's block, or None when it is used up. Caller holds _lock."""
+        block = self._blocks.get(prefix)
+        if block is None or block[0] > block[1]:
+            return None
+        block[0] += 1
+        return block[0] - 1
+
+    def next(self, prefix):
+        with self._lock:
+            # A forked child must not reuse the block its parent holds
+            if self._pid != os.getpid():
+                self._reset()
+            number = self._take(prefix)
+            refill_lock = self._refill_locks.setdefault(prefix, threading.Lock())
+        if number is None:
+            # Only threads needing this prefix wait for the round trip; the
+            # first one refills and the others take from its new block
+            with refill_lock:
+                with self._lock:
+                    number = self._take(prefix)
+                if number is None:
+                    block = self._allocate(prefix, self.block_size)
+                    with self._lock:
+                        self._blocks[prefix] = block
+                        self._allocations += 1
+                        number = self._take(prefix)
+        return f"{prefix}-{datetime.now().strftime('%Y%m%d')}-{number:08d}"
+
+    def _allocate(self, prefix, size):
+        with mysql.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('''
+                    INSERT INTO document_sequences (name, last_value)
+                    VALUES (%s, LAST_INSERT_ID(%s))
+                    ON DUPLICATE KEY UPDATE last_value = LAST_INSERT_ID(last_value + %s)
+                ''', (prefix, size, size))
+                cursor.execute('SELECT LAST_INSERT_ID()')
+                last_value = cursor.fetchone()[0]
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cursor.close()
+        return [last_value - size + 1, last_value]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'block_size': self.block_size,
+                'allocations': self._allocations,
+                'remaining': {prefix: block[1] - block[0] + 1 for prefix, block in self._blocks.items()},
+            }
+
+references = ReferenceGenerator()
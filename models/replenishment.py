@@ -0,0 +1,185 @@
+from models.database import mysql
+from models.http_cache import CollectionVersion
+import MySQLdb.cursors
+import itertools
+import numpy as np
+import threading
+import time
+from datetime import date, timedelta
+
+# product_id * KEY_FACTOR + warehouse_id identifies a stock line in one int64
+KEY_FACTOR = 1 << 32
+
+class Replenishment:
+    """Reorder points and suggested order quantities for every stock line.
+
+    Daily consumption per (product, warehouse) is the delivered quantity over
+    the last WINDOW_DAYS whole days, ending at today's midnight (today's
+    partial day is left out so the divisor is exact). From it, for each line:
+
+        safety stock   = max(min_stock_level, velocity * SAFETY_DAYS)
+        reorder point  = velocity * LEAD_TIME_DAYS + safety stock
+        order up to    = reorder point + velocity * REVIEW_DAYS
+        suggested qty  = order up to - on hand, when on hand <= reorder point
+
+    The whole catalog is loaded as flat arrays with three streamed queries and
+    computed with NumPy in one pass, without a per-line Python loop. The
+    result is cached per process until a new stock movement is logged, a
+    product changes (its collection version) or the day changes and the
+    window slides, so repeated views cost two primary-key reads.
+    """
+    WINDOW_DAYS = 30
+    LEAD_TIME_DAYS = 7
+    SAFETY_DAYS = 3
+    REVIEW_DAYS = 14
+    MAX_LIMIT = 1000
+
+    def __init__(self):
+        self._cache = None  # (version, result arrays)
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.last_duration = None
+
+    def init_app(self, app):
+        self.WINDOW_DAYS = app.config.get('REPLENISHMENT_WINDOW_DAYS', self.WINDOW_DAYS)
+        self.LEAD_TIME_DAYS = app.config.get('REPLENISHMENT_LEAD_TIME_DAYS', self.LEAD_TIME_DAYS)
+        self.SAFETY_DAYS = app.config.get('REPLENISHMENT_SAFETY_DAYS', self.SAFETY_DAYS)
+        self.REVIEW_DAYS = app.config.get('REPLENISHMENT_REVIEW_DAYS', self.REVIEW_DAYS)
+
+    @staticmethod
+    def calculate(keys, on_hand, outflow, min_level, window_days, lead_time_days, safety_days, review_days):
+        """Vectorized reorder figures for aligned per-line arrays."""
+        velocity = outflow / float(window_days)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_of_cover = np.where(velocity > 0, on_hand / velocity, np.inf)
+        safety_stock = np.maximum(min_level, velocity * safety_days)
+        reorder_point = velocity * lead_time_days + safety_stock
+        order_up_to = reorder_point + velocity * review_days
+        suggested = np.where(on_hand <= reorder_point, np.ceil(order_up_to - on_hand), 0).clip(min=0)
+        return {
+            'keys': keys,
+            'on_hand': on_hand,
+            'velocity': velocity,
+            'days_of_cover': days_of_cover,
+            'reorder_point': np.ceil(reorder_point),
+            'suggested': suggested.astype(np.int64),
+        }
+
+    @staticmethod
+    def align(stock_keys, stock_quantities, demand_keys, demand_quantities, min_levels_by_product):
+        """Arrays over the stock lines with each line's delivered quantity and minimum level.
+
+        Every movement upserts its stock row, so demand lines are a subset of
+        the stock lines; they are matched with a binary search.
+        """
+        order = np.argsort(stock_keys, kind='stable')
+        keys = stock_keys[order]
+        on_hand = stock_quantities[order].astype(np.float64)
+        outflow = np.zeros(len(keys), dtype=np.float64)
+        positions = np.searchsorted(keys, demand_keys).clip(max=max(len(keys) - 1, 0))
+        found = keys[positions] == demand_keys if len(keys) else np.zeros(len(demand_keys), dtype=bool)
+        outflow[positions[found]] = demand_quantities[found]
+        min_level = min_levels_by_product[keys // KEY_FACTOR].astype(np.float64)
+        return keys, on_hand, outflow, min_level
+
+    @staticmethod
+    def _fetch(query, params, columns):
+        """Stream a query of integer columns into an (n, columns) int64 array."""
+        cursor = mysql.connection.cursor(MySQLdb.cursors.SSCursor)
+        try:
+            cursor.execute(query, params)
+            values = np.fromiter(itertools.chain.from_iterable(cursor), dtype=np.int64)
+        finally:
+            cursor.close()
+        return values.reshape(-1, columns)
+
+    def _load(self):
+        products = Replenishment._fetch('SELECT id, COALESCE(min_stock_level, 0) FROM products', (), 2)
+        min_levels = np.zeros(int(products[:, 0].max()) + 1 if len(products) else 0, dtype=np.int64)
+        min_levels[products[:, 0]] = products[:, 1]
+
+        stock = Replenishment._fetch('''
+            SELECT product_id, warehouse_id, COALESCE(quantity, 0) FROM stock
+            ORDER BY product_id, warehouse_id
+        ''', (), 3)
+        until = date.today()
+        since = until - timedelta(days=self.WINDOW_DAYS)
+        demand = Replenishment._fetch('''
+            SELECT product_id, warehouse_id, CAST(SUM(-quantity_change) AS SIGNED)
+            FROM stock_movements
+            WHERE movement_type = 'delivery' AND created_at >= %s AND created_at < %s
+            GROUP BY product_id, warehouse_id
+        ''', (since, until), 3)
+        return Replenishment.align(stock[:, 0] * KEY_FACTOR + stock[:, 1], stock[:, 2],
+                                   demand[:, 0] * KEY_FACTOR + demand[:, 1], demand[:, 2], min_levels)
+
+    @staticmethod
+    def _version():
+        cursor = mysql.connection.cursor()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM stock_movements')
+        movement_id = cursor.fetchone()[0]
+        cursor.close()
+        return movement_id, CollectionVersion.get('products'), date.today()
+
+    def result(self):
+        version = Replenishment._version()
+        with self._lock:
+            if self._cache is None or self._cache[0] != version:
+                started = time.perf_counter()
+                result = Replenishment.calculate(*self._load(), self.WINDOW_DAYS, self.LEAD_TIME_DAYS,
+                                                 self.SAFETY_DAYS, self.REVIEW_DAYS)
+                self._cache = (version, result)
+                self.computed += 1
+                self.last_duration = time.perf_counter() - started
+            return self._cache[1]
+
+    def report(self, warehouse_id=None, limit=100):
+        """Lines that should be reordered, least days of cover first."""
+        limit = max(1, min(int(limit), self.MAX_LIMIT))
+        result = self.result()
+        mask = result['suggested'] > 0
+        if warehouse_id:
+            mask &= (result['keys'] % KEY_FACTOR) == int(warehouse_id)
+        indexes = np.flatnonzero(mask)
+        order = np.lexsort((-result['suggested'][indexes], result['days_of_cover'][indexes]))
+        indexes = indexes[order[:limit]]
+
+        lines = []
+        for index in indexes.tolist():
+            key = int(result['keys'][index])
+            cover = float(result['days_of_cover'][index])
+            lines.append({
+                'product_id': key // KEY_FACTOR,
+                'warehouse_id': key % KEY_FACTOR,
+                'on_hand': int(result['on_hand'][index]),
+                'daily_usage': round(float(result['velocity'][index]), 3),
+                'days_of_cover': round(cover, 1) if np.isfinite(cover) else None,
+                'reorder_point': int(result['reorder_point'][index]),
+                'suggested_quantity': int(result['suggested'][index]),
+            })
+        Replenishment._add_names(lines)
+        return {'lines': lines, 'total': int(mask.sum()), 'stock_lines': len(result['keys'])}
+
+    @staticmethod
+    def _add_names(lines):
+        if not lines:
+            return
+        product_ids = sorted({line['product_id'] for line in lines})
+        warehouse_ids = sorted({line['warehouse_id'] for line in lines})
+        cursor = mysql.connection.cursor()
+        cursor.execute('SELECT id, sku, name FROM products WHERE id IN (%s)' % ', '.join(['%s'] * len(product_ids)),
+                       product_ids)
+        products = {row[0]: row[1:] for row in cursor.fetchall()}
+        cursor.execute('SELECT id, name FROM warehouses WHERE id IN (%s)' % ', '.join(['%s'] * len(warehouse_ids)),
+                       warehouse_ids)
+        warehouses = dict(cursor.fetchall())
+        cursor.close()
+        for line in lines:
+            line['sku'], line['product_name'] = products.get(line['product_id'], (None, None))
+            line['warehouse_name'] = warehouses.get(line['warehouse_id'])
+
+    def stats(self):
+        return {'computed': self.computed,
+                'last_duration_ms': round(self.last_duration * 1000, 1) if self.last_duration is not None else None}
+
+replenishment = Replenishment()
@@ -0,0 +1,116 @@
+from models.database import mysql
+
+class StockReservation:
+    """Reserved quantities on stock lines.
+
+    stock.reserved holds the units promised to confirmed outgoing documents
+    (delivery orders, and transfers at their source warehouse), and
+    stock.available is the generated column quantity - reserved, so on-hand,
+    reserved and available are all read from the stock row itself. Checking a
+    whole order is one read of the (product_id, warehouse_id) unique key, not
+    a sum over open orders. Reservations change in the same transaction as
+    the order status, on stock rows locked in key order.
+    """
+
+    @staticmethod
+    def totals(items):
+        """Requested quantity per (product_id, warehouse_id) from order lines."""
+        totals = {}
+        for item in items:
+            key = (int(item['product_id']), int(item['warehouse_id']))
+            totals[key] = totals.get(key, 0) + int(item['quantity'])
+        return totals
+
+    @staticmethod
+    def lookup(cursor, keys, lock=False):
+        """On-hand, reserved and available per stock line, missing lines as zeros."""
+        keys = sorted(keys)
+        if not keys:
+            return {}
+        cursor.execute('''
+            SELECT product_id, warehouse_id, quantity, reserved, available
+            FROM stock
+            WHERE (product_id, warehouse_id) IN (%s)
+            ORDER BY product_id, warehouse_id
+        ''' % ', '.join(['(%s, %s)'] * len(keys)) + (' FOR UPDATE' if lock else ''),
+            [value for key in keys for value in key])
+        lines = {key: {'on_hand': 0, 'reserved': 0, 'available': 0} for key in keys}
+        for product_id, warehouse_id, quantity, reserved, available in cursor.fetchall():
+            lines[(product_id, warehouse_id)] = {'on_hand': quantity, 'reserved': reserved, 'available': available}
+        return lines
+
+    @staticmethod
+    def shortages(lines, totals):
+        """Lines whose available quantity does not cover the requested one."""
+        return [
+            {'product_id': product_id, 'warehouse_id': warehouse_id,
+             'requested': totals[(product_id, warehouse_id)], 'available': line['available']}
+            for (product_id, warehouse_id), line in sorted(lines.items())
+            if line['available'] < totals[(product_id, warehouse_id)]
+        ]
+
+    @staticmethod
+    def check(items):
+        """Available-to-promise check for order lines, without locking.
+
+        Returns (lines, shortages) where lines maps each requested stock line
+        to its on-hand, reserved and available quantities.
+        """
+        totals = StockReservation.totals(items)
+        cursor = mysql.connection.cursor()
+        try:
+            lines = StockReservation.lookup(cursor, totals)
+        finally:
+            cursor.close()
+        return lines, StockReservation.shortages(lines, totals)
+
+    @staticmethod
+    def allocate(cursor, requests):
+        """Reserve stock for several documents at once, in the caller's transaction.
+
+        `requests` holds (document_id, totals) pairs in priority order. The
+        lines of all documents are locked and read once; each document then
+        gets every line it asks for or nothing, and one statement applies the
+        reservations. Returns {document_id: shortages}, empty for documents
+        that were reserved.
+        """
+        lines = StockReservation.lookup(cursor, {key for _, totals in requests for key in totals}, lock=True)
+        remaining = {key: line['available'] for key, line in lines.items()}
+        reserved, shortages = {}, {}
+        for document_id, totals in requests:
+            shortages[document_id] = [
+                {'product_id': product_id, 'warehouse_id': warehouse_id,
+                 'requested': quantity, 'available': remaining[(product_id, warehouse_id)]}
+                for (product_id, warehouse_id), quantity in sorted(totals.items())
+                if remaining[(product_id, warehouse_id)] < quantity
+            ]
+            if not shortages[document_id]:
+                for key, quantity in totals.items():
+                    remaining[key] -= quantity
+                    reserved[key] = reserved.get(key, 0) + quantity
+        StockReservation.adjust(cursor, reserved)
+        return shortages
+
+    @staticmethod
+    def release(cursor, totals):
+        StockReservation.adjust(cursor, {key: -quantity for key, quantity in totals.items()})
+
+    @staticmethod
+    def adjust(cursor, changes):
+        """Add to reserved quantities with one multi-row statement, in key order."""
+        rows = [(product_id, warehouse_id, change) for (product_id, warehouse_id), change in sorted(changes.items()) if change]
+        if rows:
+            cursor.executemany('''
+                INSERT INTO stock (product_id, warehouse_id, quantity, reserved)
+                VALUES (%s, %s, 0, %s)
+                ON DUPLICATE KEY UPDATE reserved = reserved + VALUES(reserved)
+            ''', rows)
+
+    @staticmethod
+    def get_line(product_id, warehouse_id):
+        cursor = mysql.connection.cursor()
+        try:
+            lines = StockReservation.lookup(cursor, [(int(product_id), int(warehouse_id))])
+        finally:
+            cursor.close()
+        return lines[(int(product_id), int(warehouse_id))]
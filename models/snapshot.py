@@ -0,0 +1,197 @@
+from models.database import mysql
+from models.movement import MOVEMENT_TIERS, union_tiers
+import MySQLdb.cursors
+import argparse
+from datetime import datetime, timedelta
+
+class StockSnapshot:
+    """Per-(product, warehouse) quantities frozen at a point in time.
+
+    A snapshot is built from the previous one plus the movements logged after
+    it, so taking one costs the movements since the last snapshot and never a
+    replay of the ledger. "Stock as of T" starts from the snapshot nearest to
+    T and adds (or, from a later snapshot, subtracts) the movements between the
+    two. Snapshots stop LAG seconds in the past so no transaction that logged a
+    movement before the cutoff can still be uncommitted.
+
+    Take them periodically from cron: python -m models.snapshot [--at ...]
+    """
+    LAG = 300
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def init_app(app):
+        StockSnapshot.LAG = app.config.get('SNAPSHOT_LAG', StockSnapshot.LAG)
+
+    @staticmethod
+    def take(at=None):
+        """Write a snapshot as of `at` (default: LAG seconds ago). Returns its id."""
+        latest_allowed = datetime.now() - timedelta(seconds=StockSnapshot.LAG)
+        cutoff = (at or latest_allowed).replace(microsecond=0)
+        if cutoff > latest_allowed:
+            raise ValueError(f"Snapshots must be at least {StockSnapshot.LAG} seconds in the past")
+
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK('stock_snapshot', 0)")
+            if not cursor.fetchone()[0]:
+                raise RuntimeError('Another snapshot is being taken')
+            try:
+                cursor.execute('''
+                    SELECT id, taken_at FROM stock_snapshots WHERE taken_at <= %s ORDER BY taken_at DESC LIMIT 1
+                ''', (cutoff,))
+                base = cursor.fetchone()
+                if base and base[1] == cutoff:
+                    return base[0]
+
+                quantities = {}
+                if base:
+                    cursor.execute('''
+                        SELECT product_id, warehouse_id, quantity FROM stock_snapshot_lines WHERE snapshot_id = %s
+                    ''', (base[0],))
+                    for product_id, warehouse_id, quantity in cursor.fetchall():
+                        quantities[(product_id, warehouse_id)] = quantity
+
+                # Net change per stock line since the base snapshot (range scans on idx_movements_created)
+                conditions, params = ['created_at <= %s'], [cutoff]
+                if base:
+                    conditions.append('created_at > %s')
+                    params.append(base[1])
+                movements = union_tiers(f"SELECT product_id, warehouse_id, quantity_change FROM {{table}} "
+                                        f"WHERE {' AND '.join(conditions)}")
+                cursor.execute(f'''
+                    SELECT product_id, warehouse_id, SUM(quantity_change), COUNT(*)
+                    FROM ({movements}) m
+                    GROUP BY product_id, warehouse_id
+                ''', params * len(MOVEMENT_TIERS))
+                movement_count = 0
+                for product_id, warehouse_id, change, count in cursor.fetchall():
+                    key = (product_id, warehouse_id)
+                    quantities[key] = quantities.get(key, 0) + int(change)
+                    movement_count += count
+                lines = sorted((key[0], key[1], quantity) for key, quantity in quantities.items() if quantity != 0)
+
+                cursor.execute('''
+                    INSERT INTO stock_snapshots (taken_at, base_snapshot_id, line_count, movement_count)
+                    VALUES (%s, %s, %s, %s)
+                ''', (cutoff, base[0] if base else None, len(lines), movement_count))
+                snapshot_id = cursor.lastrowid
+                for start in range(0, len(lines), StockSnapshot.BATCH_SIZE):
+                    cursor.executemany('''
+                        INSERT INTO stock_snapshot_lines (snapshot_id, product_id, warehouse_id, quantity)
+                        VALUES (%s, %s, %s, %s)
+                    ''', [(snapshot_id,) + line for line in lines[start:start + StockSnapshot.BATCH_SIZE]])
+                mysql.connection.commit()
+                print(f"✅ Stock snapshot {snapshot_id} as of {cutoff}: {len(lines)} lines, {movement_count} movements applied")
+                return snapshot_id
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK('stock_snapshot')")
+                cursor.fetchone()
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def as_of(at, warehouse_id=None, product_id=None):
+        """Stock lines as of `at`: the nearest snapshot plus the movements in between.
+
+        Returns (lines, source) where `source` describes the snapshot used.
+        """
+        at = at.replace(microsecond=0)
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            # Closest snapshots on either side of `at` (index reads on taken_at)
+            cursor.execute('''
+                SELECT id, taken_at FROM stock_snapshots WHERE taken_at <= %s ORDER BY taken_at DESC LIMIT 1
+            ''', (at,))
+            before = cursor.fetchone()
+            cursor.execute('''
+                SELECT id, taken_at FROM stock_snapshots WHERE taken_at > %s ORDER BY taken_at LIMIT 1
+            ''', (at,))
+            after = cursor.fetchone()
+
+            # Walk from whichever snapshot is closer in time
+            if after and (before is None or after['taken_at'] - at < at - before['taken_at']):
+                snapshot, sign = after, -1
+                movement_conditions, movement_params = ['created_at > %s', 'created_at <= %s'], [at, after['taken_at']]
+            else:
+                snapshot, sign = before, 1
+                movement_conditions, movement_params = ['created_at <= %s'], [at]
+                if before:
+                    movement_conditions.append('created_at > %s')
+                    movement_params.append(before['taken_at'])
+
+            line_conditions, line_params = ['snapshot_id = %s'], [snapshot['id'] if snapshot else 0]
+            for column, value in (('warehouse_id', warehouse_id), ('product_id', product_id)):
+                if value:
+                    line_conditions.append(f'{column} = %s')
+                    line_params.append(int(value))
+                    movement_conditions.append(f'{column} = %s')
+                    movement_params.append(int(value))
+
+            movements = union_tiers(f"SELECT product_id, warehouse_id, %s * quantity_change FROM {{table}} "
+                                    f"WHERE {' AND '.join(movement_conditions)}")
+            cursor.execute(f'''
+                SELECT t.product_id, t.warehouse_id, t.quantity,
+                       p.name as product_name, p.sku, w.name as warehouse_name
+                FROM (
+                    SELECT product_id, warehouse_id, CAST(SUM(quantity) AS SIGNED) as quantity
+                    FROM (
+                        SELECT product_id, warehouse_id, quantity
+                        FROM stock_snapshot_lines
+                        WHERE {' AND '.join(line_conditions)}
+                        UNION ALL
+                        {movements}
+                    ) u
+                    GROUP BY product_id, warehouse_id
+                ) t
+                JOIN products p ON p.id = t.product_id
+                JOIN warehouses w ON w.id = t.warehouse_id
+                WHERE t.quantity <> 0
+                ORDER BY p.name, w.name
+            ''', line_params + ([sign] + movement_params) * len(MOVEMENT_TIERS))
+            lines = list(cursor.fetchall())
+        finally:
+            cursor.close()
+
+        source = {
+            'as_of': at,
+            'snapshot_id': snapshot['id'] if snapshot else None,
+            'snapshot_taken_at': snapshot['taken_at'] if snapshot else None,
+            'direction': 'backward' if sign < 0 else 'forward',
+        }
+        return lines, source
+
+    @staticmethod
+    def get_recent(limit=20):
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute('''
+            SELECT id, taken_at, line_count, movement_count, created_at
+            FROM stock_snapshots
+            ORDER BY taken_at DESC
+            LIMIT %s
+        ''', (limit,))
+        snapshots = cursor.fetchall()
+        cursor.close()
+        return snapshots
+
+def main():
+    from flask import Flask
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Take a stock snapshot')
+    parser.add_argument('--at', type=datetime.fromisoformat,
+                        help='snapshot time, e.g. 2026-09-30T23:59:59 (default: SNAPSHOT_LAG seconds ago)')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    mysql.init_app(app)
+    StockSnapshot.init_app(app)
+    with app.app_context():
+        StockSnapshot.take(args.at)
+
+if __name__ == '__main__':
+    main()
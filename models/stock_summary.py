@@ -0,0 +1,166 @@
+from models.database import mysql
+import MySQLdb.cursors
+import json
+
+STOCK_STATUSES = ('low', 'out')
+
+class StockSummary:
+    """Per-product stock totals for the products page.
+
+    product_stock_summary keeps one row per product with its total quantity
+    over all warehouses and the number of its stock lines below
+    min_stock_level. The stock mutation path updates it in the same
+    transaction that moves the stock, after the stock and alert rows, so a
+    catalog page is a single query: products in name order joined to their
+    summary row, plus a per-warehouse pivot read from the stock unique key
+    (product_id, warehouse_id) for just the products on the page.
+    """
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+
+    @staticmethod
+    def apply(cursor, lines):
+        """Fold stock line changes of this transaction into the summary.
+
+        `lines` holds (product_id, warehouse_id, quantity_before,
+        quantity_after, min_stock_level) tuples, as for
+        LowStockAlert.apply_crossings.
+        """
+        changes = {}
+        for product_id, warehouse_id, before, after, min_level in lines:
+            total, low = changes.get(product_id, (0, 0))
+            changes[product_id] = (total + after - before, low + (after < min_level) - (before < min_level))
+        rows = [(product_id, total, low) for product_id, (total, low) in sorted(changes.items()) if total or low]
+        if rows:
+            cursor.executemany('''
+                INSERT INTO product_stock_summary (product_id, total_quantity, low_stock_lines)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE total_quantity = total_quantity + VALUES(total_quantity),
+                    low_stock_lines = low_stock_lines + VALUES(low_stock_lines)
+            ''', rows)
+
+    @staticmethod
+    def recount_low_lines(cursor, product_ids):
+        """Recount below-minimum lines from the alert set after a threshold change.
+
+        Call it after LowStockAlert.reevaluate_products for the same products.
+        """
+        product_ids = sorted({int(product_id) for product_id in product_ids})
+        if not product_ids:
+            return
+        cursor.execute('''
+            UPDATE product_stock_summary ss
+            SET low_stock_lines = (SELECT COUNT(*) FROM low_stock_alerts a WHERE a.product_id = ss.product_id)
+            WHERE ss.product_id IN (%s)
+        ''' % ', '.join(['%s'] * len(product_ids)), product_ids)
+
+    @staticmethod
+    def rebuild():
+        """Recompute every summary row from stock; used to correct drift.
+
+        The summary rows are deleted first, so writers wait for the rewrite
+        and add their delta on top. Totals are then read with a plain
+        (non-locking) SELECT, so no stock row is locked after the summary
+        rows, against the stock -> summary lock order.
+        """
+        mysql.connection.rollback()
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('DELETE FROM product_stock_summary')
+            cursor.execute('''
+                SELECT s.product_id, SUM(s.quantity), SUM(s.quantity < COALESCE(p.min_stock_level, 0))
+                FROM stock s
+                JOIN products p ON p.id = s.product_id
+                GROUP BY s.product_id
+                ORDER BY s.product_id
+            ''')
+            rows = cursor.fetchall()
+            if rows:
+                cursor.executemany('''
+                    INSERT INTO product_stock_summary (product_id, total_quantity, low_stock_lines)
+                    VALUES (%s, %s, %s)
+                ''', rows)
+            mysql.connection.commit()
+            return len(rows)
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def encode_cursor(product):
+        return json.dumps([product['name'], product['id']], separators=(',', ':'))
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            name, product_id = json.loads(cursor)
+            return str(name), int(product_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+
+    @staticmethod
+    def search(category_id=None, warehouse_id=None, stock_status=None, cursor=None, limit=PAGE_SIZE):
+        """Return one page of products with their stock, by name, and the next page's cursor.
+
+        Each product carries `total_stock` (all warehouses), `below_minimum`
+        and `quantities`, a {warehouse_id: quantity} dict. With a warehouse
+        filter only products holding stock there are listed and `quantities`
+        is limited to that warehouse. `stock_status` is 'low' (some line below
+        its minimum) or 'out' (nothing on hand). Paging seeks past the last
+        (name, id) seen, which idx_products_name serves without OFFSET.
+        """
+        limit = max(1, min(int(limit), StockSummary.MAX_PAGE_SIZE))
+        conditions, params = [], []
+        pivot_filter, pivot_params = '', []
+        if category_id:
+            conditions.append('p.category_id = %s')
+            params.append(int(category_id))
+        if warehouse_id:
+            conditions.append('EXISTS (SELECT 1 FROM stock sw WHERE sw.product_id = p.id '
+                              'AND sw.warehouse_id = %s AND sw.quantity <> 0)')
+            params.append(int(warehouse_id))
+            pivot_filter = ' AND s.warehouse_id = %s'
+            pivot_params.append(int(warehouse_id))
+        if stock_status:
+            if stock_status not in STOCK_STATUSES:
+                raise ValueError(f"Unknown stock status: {stock_status}")
+            conditions.append('ss.low_stock_lines > 0' if stock_status == 'low'
+                              else 'COALESCE(ss.total_quantity, 0) <= 0')
+        if cursor:
+            name, product_id = StockSummary.decode_cursor(cursor)
+            conditions.append('(p.name > %s OR (p.name = %s AND p.id > %s))')
+            params.extend([name, name, product_id])
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+
+        db_cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        db_cursor.execute(f'''
+            SELECT p.id, p.name, p.sku, p.unit_of_measure, p.min_stock_level, p.category_id,
+                   c.name as category_name,
+                   COALESCE(ss.total_quantity, 0) as total_stock,
+                   COALESCE(ss.low_stock_lines, 0) > 0 as below_minimum,
+                   (SELECT JSON_OBJECTAGG(s.warehouse_id, s.quantity)
+                    FROM stock s
+                    WHERE s.product_id = p.id{pivot_filter}) as quantities
+            FROM products p
+            LEFT JOIN product_categories c ON c.id = p.category_id
+            LEFT JOIN product_stock_summary ss ON ss.product_id = p.id
+            {where}
+            ORDER BY p.name, p.id
+            LIMIT %s
+        ''', pivot_params + params + [limit + 1])
+        products = db_cursor.fetchall()
+        db_cursor.close()
+
+        for product in products:
+            product['total_stock'] = int(product['total_stock'])
+            product['below_minimum'] = bool(product['below_minimum'])
+            quantities = json.loads(product['quantities']) if product['quantities'] else {}
+            product['quantities'] = {int(key): value for key, value in quantities.items()}
+
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            next_cursor = StockSummary.encode_cursor(products[-1])
+        return products, next_cursor
@@ -1,7 +1,97 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from models.database import mysql
+from collections import OrderedDict
 import MySQLdb.cursors
+import threading
+import time
+
+class SessionUser:
+    """Password-less view of a user kept in the request-loader cache.
+
+    Implements the Flask-Login user interface itself rather than inheriting
+    UserMixin, which has no __slots__ and would give every instance a __dict__.
+    """
+    __slots__ = ('id', 'name', 'email', 'role', 'created_at')
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, name, email, role, created_at):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.role = role
+        self.created_at = created_at
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        if isinstance(other, SessionUser):
+            return self.get_id() == other.get_id()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+class UserCache:
+    """Bounded LRU cache of SessionUser objects with a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('USER_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user):
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+user_cache = UserCache()
 
 class User(UserMixin):
     def __init__(self, id, name, email, password, role, created_at):
@@ -34,6 +124,18 @@ class User(UserMixin):
             print(f"Error getting user by ID: {e}")
             return None
 
+    @staticmethod
+    def get_cached(user_id):
+        """Return a SessionUser for the request loader, hitting MySQL only on a cache miss."""
+        user = user_cache.get(user_id)
+        if user is None:
+            loaded = User.get_by_id(user_id)
+            if loaded is None:
+                return None
+            user = SessionUser(loaded.id, loaded.name, loaded.email, loaded.role, loaded.created_at)
+            user_cache.put(user)
+        return user
+
     @staticmethod
     def get_by_email(email):
         try:
@@ -70,6 +172,7 @@ class User(UserMixin):
             mysql.connection.commit()
             user_id = cursor.lastrowid
             cursor.close()
+            user_cache.invalidate(user_id)
             
             print(f"✅ User created successfully with ID: {user_id}")
             return User.get_by_id(user_id)
@@ -78,5 +181,23 @@ class User(UserMixin):
             mysql.connection.rollback()
             return None
 
+    @staticmethod
+    def update(user_id, name, email, role):
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute('''
+                UPDATE users
+                SET name = %s, email = %s, role = %s
+                WHERE id = %s
+            ''', (name, email, role, user_id))
+            mysql.connection.commit()
+            user_cache.invalidate(user_id)
+            return True
+        except Exception as e:
+            mysql.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
     def check_password(self, password):
         return check_password_hash(self.password, password)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from models.database import mysql
+from models.http_cache import CollectionVersion
 import MySQLdb.cursors
 
 class Warehouse:
@@ -32,6 +33,7 @@ class Warehouse:
                 INSERT INTO warehouses (name, location)
                 VALUES (%s, %s)
             ''', (name, location))
+            CollectionVersion.bump(cursor, 'warehouses')
             mysql.connection.commit()
             return True
         except Exception as e:
@@ -49,6 +51,7 @@ class Warehouse:
                 SET name = %s, location = %s
                 WHERE id = %s
             ''', (name, location, warehouse_id))
+            CollectionVersion.bump(cursor, 'warehouses')
             mysql.connection.commit()
             return True
         except Exception as e:
@@ -62,6 +65,7 @@ class Warehouse:
         cursor = mysql.connection.cursor()
         try:
             cursor.execute('DELETE FROM warehouses WHERE id = %s', (warehouse_id,))
+            CollectionVersion.bump(cursor, 'warehouses')
             mysql.connection.commit()
             return True
         except Exception as e:
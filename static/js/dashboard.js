@@ -37,25 +37,32 @@ function showLowStockAlert(alerts) {
 }
 
 function setupRealTimeUpdates() {
-    // Simulate real-time updates (in a real app, you'd use WebSockets)
-    setInterval(() => {
-        updateKPI('pending-receipts');
-        updateKPI('pending-deliveries');
-    }, 30000); // Update every 30 seconds
+    // Poll the server-maintained KPI counters (in a real app, you'd use WebSockets)
+    setInterval(updateKPIs, 30000); // Update every 30 seconds
 }
 
-async function updateKPI(kpiType) {
+async function updateKPIs() {
     try {
-        // This would be an API endpoint that returns updated KPI data
-        // For now, we'll just simulate an update
-        const kpiElement = document.querySelector(`[data-kpi="${kpiType}"]`);
-        if (kpiElement) {
-            const currentValue = parseInt(kpiElement.textContent);
-            const change = Math.random() > 0.5 ? 1 : -1;
-            kpiElement.textContent = Math.max(0, currentValue + change);
+        const response = await fetch('/api/kpis');
+        if (!response.ok) {
+            return;
         }
+        const kpis = await response.json();
+        const values = {
+            'total-products': kpis.total_products,
+            'low-stock': kpis.low_stock,
+            'pending-receipts': kpis.pending_receipts,
+            'pending-deliveries': kpis.pending_deliveries,
+            'pending-transfers': kpis.pending_transfers,
+        };
+        Object.entries(values).forEach(([kpiType, value]) => {
+            const kpiElement = document.querySelector(`[data-kpi="${kpiType}"]`);
+            if (kpiElement) {
+                kpiElement.textContent = value;
+            }
+        });
     } catch (error) {
-        console.error('Failed to update KPI:', error);
+        console.error('Failed to update KPIs:', error);
     }
 }
 
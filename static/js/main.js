@@ -9,6 +9,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Initialize dynamic filters
     initFilters();
+    
+    // Turn product selects into server-side search boxes
+    document.querySelectorAll('select[data-product-search]').forEach(enhanceProductSelect);
 });
 
 function initTooltips() {
@@ -73,6 +76,58 @@ function initFilters() {
     });
 }
 
+// Product autocomplete: the select only ever holds the current matches
+function enhanceProductSelect(select) {
+    if (!select || select.dataset.enhanced) {
+        return;
+    }
+    select.dataset.enhanced = 'true';
+
+    const input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'form-control';
+    input.placeholder = 'Type SKU or product name...';
+    input.autocomplete = 'off';
+    select.parentNode.insertBefore(input, select);
+
+    let timer = null;
+    let controller = null;
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(async () => {
+            const query = input.value.trim();
+            if (!query) {
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            try {
+                const response = await fetch(`/api/products/autocomplete?q=${encodeURIComponent(query)}`,
+                                             { signal: controller.signal });
+                const products = await response.json();
+                select.innerHTML = '';
+                products.forEach(product => {
+                    const option = document.createElement('option');
+                    option.value = product.id;
+                    option.dataset.sku = product.sku;
+                    option.textContent = `${product.name} (${product.sku})`;
+                    select.appendChild(option);
+                });
+                if (!products.length) {
+                    select.innerHTML = '<option value="">No matching products</option>';
+                }
+                select.dispatchEvent(new Event('change'));
+            } catch (error) {
+                if (error.name !== 'AbortError') {
+                    console.error('Product search failed:', error);
+                }
+            }
+        }, 150);
+    });
+}
+
 // AJAX helper functions
 async function apiCall(url, options = {}) {
     try {